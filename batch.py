@@ -0,0 +1,254 @@
+"""
+Batched pairwise connection finder for Tm8s
+"""
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from instrumentation import metrics
+
+# Per-player spells sorted by (club_id, start): club_ids, starts, ends
+KeyedSpells = Tuple[array, array, array]
+
+
+class BatchResult:
+    """
+    Columnar result of a batch connection search
+
+    Row i says pair pair_index[i] shared clubs[club_id[i]] from
+    overlap_start[i] to overlap_end[i]. Rows are grouped by pair, in input order
+    """
+    COLUMNS = ("pair_index", "club_id", "overlap_start", "overlap_end",
+               "p1_start", "p1_end", "p2_start", "p2_end")
+
+    def __init__(self, clubs: Optional[List[str]] = None) -> None:
+        """
+        :arg clubs: Club names indexed by club_id
+        """
+        self.clubs: List[str] = clubs if clubs is not None else []
+        self.pair_index = array('i')
+        self.club_id = array('i')
+        self.overlap_start = array('i')
+        self.overlap_end = array('i')
+        self.p1_start = array('i')
+        self.p1_end = array('i')
+        self.p2_start = array('i')
+        self.p2_end = array('i')
+
+
+    def __len__(self) -> int:
+        return len(self.pair_index)
+
+    def columns(self) -> Dict[str, array]:
+        """All result columns by name"""
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def pair_counts(self, pair_count: int) -> array:
+        """
+        Number of shared spells for each input pair
+
+        :arg pair_count: Number of pairs in the batch
+        """
+        counts = array('i', [0]) * pair_count
+        for pair in self.pair_index:
+            counts[pair] += 1
+        return counts
+
+    def rows(self) -> Iterator[Tuple[int, str, int, int, int, int, int, int]]:
+        """Decode rows as (pair_index, club, overlap_start, overlap_end, p1_start, p1_end, p2_start, p2_end)"""
+        clubs = self.clubs
+        for pair, club, *years in zip(*self.columns().values()):
+            yield (pair, clubs[club], *years)
+
+
+    def extend(self, other: "BatchResult", pair_offset: int) -> None:
+        """
+        Append another result, shifting its pair indexes and remapping its club IDs
+
+        :arg other: Result of a later shard
+        :arg pair_offset: Index of the shard's first pair in the whole batch
+        """
+        club_ids = {club: i for i, club in enumerate(self.clubs)}
+        remap = array('i')
+        for club in other.clubs:
+            if club not in club_ids:
+                club_ids[club] = len(self.clubs)
+                self.clubs.append(club)
+            remap.append(club_ids[club])
+
+        self.pair_index.extend(pair + pair_offset for pair in other.pair_index)
+        self.club_id.extend(remap[club] for club in other.club_id)
+        for name in self.COLUMNS[2:]:
+            getattr(self, name).extend(getattr(other, name))
+
+
+class BatchConnectionFinder:
+    """
+    Finds connections for many player pairs at once
+
+    Each player's spells are converted once per batch into int arrays sorted
+    by (club_id, start), and every pair is answered by a sort-merge join on
+    club_id. Large batches can be sharded across a process pool
+    """
+    def __init__(self, db) -> None:
+        """
+        :arg db: A loaded PlayerDatabase (any implementation)
+        """
+        self.db = db
+        # One loaded version for the whole batch, even if the database reloads meanwhile
+        self.state = db.state
+        self._keyed: Dict[str, KeyedSpells] = {}
+
+        # A ColumnStore already has interned club IDs to join on
+        self.columnar = hasattr(self.state, "get_player_rows")
+        self.clubs: List[str] = self.state.club_names if self.columnar else []
+        self.club_ids: Dict[str, int] = self.state.club_ids if self.columnar else {}
+
+
+    def keyed_spells(self, player_name: str) -> KeyedSpells:
+        """
+        A player's spells as arrays sorted by (club_id, start), cached per finder
+
+        :arg player_name: The name of the player
+        """
+        keyed = self._keyed.get(player_name)
+        if keyed is None:
+            if self.columnar:
+                store = self.state
+                spells = sorted((store.club_column[row], store.start_column[row], store.end_column[row])
+                                for row in store.get_player_rows(player_name))
+            else:
+                spells = []
+                for club, start_year, end_year in self.state.get_player_data(player_name):
+                    club_id = self.club_ids.get(club)
+                    if club_id is None:
+                        club_id = self.club_ids[club] = len(self.clubs)
+                        self.clubs.append(club)
+                    spells.append((club_id, start_year, end_year))
+                spells.sort()
+
+            keyed = (array('i', [spell[0] for spell in spells]),
+                     array('i', [spell[1] for spell in spells]),
+                     array('i', [spell[2] for spell in spells]))
+            self._keyed[player_name] = keyed
+        return keyed
+
+
+    def find_connections(self, first: Sequence[str], second: Sequence[str],
+                         workers: int = 0, shard_size: int = 50_000) -> BatchResult:
+        """
+        Find every shared spell for each pair (first[i], second[i])
+
+        :arg first: Player 1 of each pair
+        :arg second: Player 2 of each pair
+        :arg workers: Process pool size; 0 runs in this process
+        :arg shard_size: Pairs per process pool task
+
+        Pool processes load the CSV themselves. Any that find a different
+        version than this finder's state answer nothing, and their shards are
+        joined here instead, so the whole batch sees one version
+        """
+        if len(first) != len(second):
+            raise ValueError("first and second must be the same length")
+
+        if workers <= 0 or len(first) <= shard_size:
+            return self._join_pairs(first, second)
+
+        result = BatchResult()
+        starts = range(0, len(first), shard_size)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(type(self.db), self.db.csv_file, self.state.stamp)) as pool:
+            shards = pool.map(_join_shard, [(list(first[i:i + shard_size]), list(second[i:i + shard_size]))
+                                            for i in starts])
+            for start, shard in zip(starts, shards):
+                if shard is None:
+                    metrics.count("batch_shards_joined_locally", 1)
+                    shard = self._join_pairs(first[start:start + shard_size], second[start:start + shard_size])
+                result.extend(shard, start)
+        return result
+
+
+    def find_cross_connections(self, group_a: Sequence[str], group_b: Sequence[str],
+                               workers: int = 0) -> Tuple[BatchResult, List[Tuple[str, str]]]:
+        """
+        Find connections for every pair across two groups, e.g. a squad against a league
+
+        :arg group_a: First group of player names
+        :arg group_b: Second group of player names
+        :arg workers: Process pool size; 0 runs in this process
+        :return: The result and the pairs its pair_index refers to
+        """
+        pairs = [(a, b) for a in group_a for b in group_b if a != b]
+        first = [a for a, _ in pairs]
+        second = [b for _, b in pairs]
+        return self.find_connections(first, second, workers), pairs
+
+
+    def _join_pairs(self, first: Sequence[str], second: Sequence[str]) -> BatchResult:
+        """Sort-merge join each pair's keyed spells on club_id"""
+        result = BatchResult()
+        pair_index = result.pair_index
+        club_column = result.club_id
+        overlap_start = result.overlap_start
+        overlap_end = result.overlap_end
+        p1_start_column, p1_end_column = result.p1_start, result.p1_end
+        p2_start_column, p2_end_column = result.p2_start, result.p2_end
+
+        for pair, (p1, p2) in enumerate(zip(first, second)):
+            clubs_a, starts_a, ends_a = self.keyed_spells(p1)
+            clubs_b, starts_b, ends_b = self.keyed_spells(p2)
+            i, j = 0, 0
+            len_a, len_b = len(clubs_a), len(clubs_b)
+
+            while i < len_a and j < len_b:
+                club_a, club_b = clubs_a[i], clubs_b[j]
+                if club_a < club_b:
+                    i += 1
+                elif club_a > club_b:
+                    j += 1
+                else:
+                    group_end_b = j
+                    while group_end_b < len_b and clubs_b[group_end_b] == club_a:
+                        group_end_b += 1
+                    while i < len_a and clubs_a[i] == club_a:
+                        p1_start, p1_end = starts_a[i], ends_a[i]
+                        for k in range(j, group_end_b):
+                            p2_start, p2_end = starts_b[k], ends_b[k]
+                            start = p1_start if p1_start > p2_start else p2_start
+                            end = p1_end if p1_end < p2_end else p2_end
+                            if start < end:
+                                pair_index.append(pair)
+                                club_column.append(club_a)
+                                overlap_start.append(start)
+                                overlap_end.append(end)
+                                p1_start_column.append(p1_start)
+                                p1_end_column.append(p1_end)
+                                p2_start_column.append(p2_start)
+                                p2_end_column.append(p2_end)
+                        i += 1
+                    j = group_end_b
+
+        result.clubs = list(self.clubs)
+        return result
+
+
+_worker_finder: Optional[BatchConnectionFinder] = None
+
+
+def _init_worker(db_class, csv_file: str, stamp: Any) -> None:
+    """
+    Load the database once per pool process, keeping it only if it is the parent's version
+
+    :arg stamp: Stamp of the parent finder's state
+    """
+    global _worker_finder
+    db = db_class(csv_file, index_names=False)
+    _worker_finder = BatchConnectionFinder(db) if db.state.stamp == stamp else None
+
+
+def _join_shard(shard: Tuple[List[str], List[str]]) -> Optional[BatchResult]:
+    """Answer one shard of pairs in a pool process, or None when it loaded another version"""
+    if _worker_finder is None:
+        return None
+    return _worker_finder._join_pairs(*shard)
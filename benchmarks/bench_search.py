@@ -0,0 +1,86 @@
+"""
+Benchmark for PlayerDatabase.search_players
+
+Compares the trigram/prefix NameIndex with the original lowercase substring
+scan over a synthetic list of player names
+
+usage: python benchmarks/bench_search.py [--names 500000] [--seed 7]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search_index import NameIndex
+
+FIRST = ["Lionel", "Cristiano", "Kylian", "Sadio", "Thomas", "N'Golo", "James", "Erling",
+         "Mohamed", "Virgil", "Kevin", "Luka", "Robert", "Karim", "Andrés", "Zlatan"]
+LAST = ["Messi", "Ronaldo", "Mbappé", "Mané", "Müller", "Kanté", "Rodríguez", "Haaland",
+        "Salah", "van Dijk", "De Bruyne", "Modrić", "Lewandowski", "Benzema", "Iniesta"]
+SYLLABLES = ["ba", "ro", "ki", "tes", "mon", "dra", "vic", "el", "lu", "sen", "gor", "an",
+             "zi", "per", "ne", "hol", "ja", "us", "tri", "om"]
+QUERIES = ["mbappe", "mull", "ronal", "salah", "dijk", "kante", "lewandosky", "rodrig", "ka", "zlatan ib"]
+
+
+def make_names(count: int, seed: int) -> List[str]:
+    """
+    Deterministic unique names
+
+    One in ten uses a real surname so the queries have hits, the rest get
+    generated surnames so trigram posting lists have a realistic spread
+    """
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        if rng.random() < 0.1:
+            last = rng.choice(LAST)
+        else:
+            last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        names.add(f"{rng.choice(FIRST)} {last} {len(names):x}")
+    return sorted(names)
+
+
+def time_queries(search: Callable[[str], List[str]], repeat: int) -> float:
+    """Mean milliseconds per query"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            search(query)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(QUERIES))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--names", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = make_names(args.names, args.seed)
+
+    start = time.perf_counter()
+    index = NameIndex(names)
+    build = time.perf_counter() - start
+
+    def scan(query: str) -> List[str]:
+        query = query.lower()
+        return [name for name in names if query in name.lower()]
+
+    scan_ms = time_queries(scan, 1)
+    index_ms = time_queries(lambda query: index.search(query, args.limit), args.repeat)
+
+    print(f"names:          {len(names)}")
+    print(f"index build:    {build:.2f} s")
+    print(f"substring scan: {scan_ms:.3f} ms/query")
+    print(f"NameIndex:      {index_ms:.3f} ms/query (top {args.limit})")
+    print(f"speedup:        {scan_ms / index_ms:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Synthetic career data generator for Tm8s benchmarks
+
+Writes a players_database.csv-shaped file with a fixed seed, so the same
+arguments always produce the same bytes. Careers follow power laws: most
+players have a few short spells, a few have long careers with many clubs.
+Transfers prefer popular clubs and clubs in the same "league" block
+
+usage: python benchmarks/generate_data.py --spells 1000000 --clubs 5000 -o big.csv
+"""
+
+import argparse
+import csv
+import random
+import sys
+from typing import Iterator, List, Tuple
+
+FIRST = ["Lionel", "Cristiano", "Kylian", "Sadio", "Thomas", "N'Golo", "James", "Erling", "Mohamed",
+         "Virgil", "Kevin", "Luka", "Robert", "Karim", "Andrés", "Zlatan", "João", "Łukasz", "Son",
+         "Édouard", "Ángel", "Jürgen", "Pedro", "Marco", "Hakim", "Achraf", "Bukayo", "Jamal"]
+SYLLABLES = ["ba", "ro", "ki", "tes", "mon", "dra", "vic", "el", "lu", "sen", "gor", "an", "zi",
+             "per", "ne", "hol", "ja", "us", "tri", "om", "é", "ü", "sz", "ço"]
+CLUB_WORDS = ["United", "City", "Athletic", "Rovers", "Sporting", "Real", "Dynamo", "Olympique",
+              "Inter", "Racing", "Atlético", "Wanderers", "FC", "SC"]
+
+FIRST_YEAR = 1960
+LAST_YEAR = 2025
+
+
+def power_law(rng: random.Random, alpha: float, low: int, high: int) -> int:
+    """Integer in [low, high] drawn from a truncated Pareto distribution"""
+    return min(high, int(low * rng.paretovariate(alpha)))
+
+
+def make_clubs(rng: random.Random, count: int) -> List[str]:
+    names = set()
+    while len(names) < count:
+        town = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        names.add(f"{town} {rng.choice(CLUB_WORDS)} {len(names)}")
+    return sorted(names)
+
+
+def generate_spells(players: int, clubs: int, seed: int, league_size: int = 20
+                    ) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    Yield (player, club, start, end) rows, one player's career at a time
+
+    :arg players: Number of players
+    :arg clubs: Number of clubs
+    :arg seed: Random seed
+    :arg league_size: Clubs per league block; most transfers stay within a block
+    """
+    rng = random.Random(seed)
+    club_names = make_clubs(rng, clubs)
+    # Zipf-like club popularity: low indexes are the big clubs
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(clubs)]
+
+    for player_id in range(players):
+        last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        name = f"{rng.choice(FIRST)} {last} {player_id:x}"
+
+        spell_count = power_law(rng, 1.6, 1, 25)
+        start = rng.randint(FIRST_YEAR, LAST_YEAR - 1)
+        club = rng.choices(range(clubs), weights)[0]
+
+        for _ in range(spell_count):
+            if start >= LAST_YEAR:
+                break
+            end = min(LAST_YEAR, start + power_law(rng, 1.8, 1, 15))
+            yield name, club_names[club], start, end
+
+            if rng.random() < 0.8:
+                block = club - club % league_size
+                club = rng.randrange(block, min(clubs, block + league_size))
+            else:
+                club = rng.choices(range(clubs), weights)[0]
+            start = end
+
+
+def write_csv(path: str, players: int, clubs: int, seed: int) -> int:
+    """
+    Write a generated dataset to a CSV file
+
+    :return: Number of spells written
+    """
+    rows = 0
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Player Name", "Club", "Start Year", "End Year"])
+        for row in generate_spells(players, clubs, seed):
+            writer.writerow(row)
+            rows += 1
+    return rows
+
+
+def players_for_spells(spells: int) -> int:
+    """Player count that yields roughly the requested number of spells"""
+    return max(1, int(spells / 1.9))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Tm8s career CSV")
+    parser.add_argument("-o", "--output", required=True, help="CSV file to write")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--players", type=int, help="number of players")
+    size.add_argument("--spells", type=int, help="approximate number of spells (10k-10M)")
+    parser.add_argument("--clubs", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    players = args.players or players_for_spells(args.spells)
+    rows = write_csv(args.output, players, args.clubs, args.seed)
+    print(f"{args.output}: {players} players, {args.clubs} clubs, {rows} spells")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
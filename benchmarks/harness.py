@@ -0,0 +1,288 @@
+"""
+Benchmark harness for Tm8s hot paths
+
+Generates (or reuses) a synthetic CSV per size with generate_data.py, then
+records wall time, peak Python memory and throughput for:
+
+    load_database     PlayerDatabase, CompactPlayerDatabase (CSV and snapshot), SQLitePlayerDatabase
+    search_players    prefix queries taken from real names in the dataset
+    connections       find_player_connections / find_connections_in on random pairs
+    gui_population    completer model fills, only when PyQt6 is importable
+
+Wall time is the best of --repeat runs; peak memory comes from one extra
+run under tracemalloc so tracing does not skew the timings. Results are
+written as JSON, and --compare flags every benchmark that got slower than
+a previous results file by more than --threshold
+
+usage: python benchmarks/harness.py --spells 10000 100000 -o results.json
+       python benchmarks/harness.py --spells 10000 100000 --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from generate_data import players_for_spells, write_csv
+
+from compact_database import CompactPlayerDatabase
+from connections import ConnectionFinder
+from database import PlayerDatabase
+from snapshot import snapshot_path
+from sqlite_database import SQLitePlayerDatabase
+
+Result = Dict[str, Any]
+
+
+def measure(name: str, size: int, fn: Callable[[], int], unit: str, repeat: int) -> Result:
+    """
+    Time a benchmark and measure its peak memory
+
+    :arg name: Benchmark name
+    :arg size: Number of spells in the dataset
+    :arg fn: Runs the benchmark once and returns how many units it processed
+    :arg unit: What fn counts, for the throughput figure
+    :arg repeat: Timed runs; the fastest is kept
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        count = fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    wall = min(times)
+    return {
+        "name": name,
+        "size": size,
+        "wall_s": round(wall, 6),
+        "peak_mb": round(peak / 2 ** 20, 3),
+        "count": count,
+        "unit": unit,
+        "throughput": round(count / wall, 1) if wall else None
+    }
+
+
+def dataset(size: int, clubs: int, seed: int, data_dir: str) -> str:
+    """Path of the generated CSV for a size, writing it on first use"""
+    path = os.path.join(data_dir, f"tm8s_{size}_{clubs}_{seed}.csv")
+    if not os.path.exists(path):
+        write_csv(path, players_for_spells(size), clubs, seed)
+    return path
+
+
+def remove_caches(csv_file: str) -> None:
+    for path in (snapshot_path(csv_file), csv_file + ".sqlite"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def bench_load(csv_file: str, size: int, repeat: int, backends: List[str]) -> List[Result]:
+    rows = sum(1 for _ in open(csv_file, newline='')) - 1
+    loaders: Dict[str, Callable[[], object]] = {
+        "dict": lambda: PlayerDatabase(csv_file),
+        "compact": lambda: CompactPlayerDatabase(csv_file, use_snapshot=False),
+        "snapshot": lambda: CompactPlayerDatabase(csv_file),
+        "sqlite": lambda: SQLitePlayerDatabase(csv_file),
+    }
+
+    results = []
+    remove_caches(csv_file)
+    for backend in backends:
+        load = loaders[backend]
+        if backend in ("snapshot", "sqlite"):
+            # The first load writes the snapshot / SQLite file; time the warm loads after it
+            load()
+
+        def run() -> int:
+            load()
+            return rows
+        results.append(measure(f"load_database[{backend}]", size, run, "rows", repeat))
+    remove_caches(csv_file)
+    return results
+
+
+def bench_search(db: PlayerDatabase, size: int, repeat: int, queries: int, seed: int) -> Result:
+    rng = random.Random(seed)
+    players = db.get_all_players()
+    texts = [rng.choice(players)[:rng.randint(2, 8)] for _ in range(queries)]
+    db.name_index
+
+    def run() -> int:
+        for text in texts:
+            db.search_players(text, 25)
+        return len(texts)
+    return measure("search_players", size, run, "queries", repeat)
+
+
+def bench_connections(db: PlayerDatabase, size: int, repeat: int, pairs: int, seed: int) -> List[Result]:
+    rng = random.Random(seed)
+    players = db.get_all_players()
+    # Pairs of players who share a club, so the join does real work, plus random pairs
+    sampled: List[Tuple[str, str]] = []
+    clubs = db.get_all_clubs()
+    while len(sampled) < pairs // 2:
+        index = db.club_index[rng.choice(clubs)]
+        if len(index.players) > 1:
+            first, second = rng.sample(range(len(index.players)), 2)
+            sampled.append((index.players[first], index.players[second]))
+    sampled += [tuple(rng.sample(players, 2)) for _ in range(pairs - len(sampled))]
+
+    finder = ConnectionFinder()
+    data = [(db.get_player_data(p1), db.get_player_data(p2)) for p1, p2 in sampled]
+
+    def run_player() -> int:
+        for p1_clubs, p2_clubs in data:
+            finder.find_player_connections(p1_clubs, p2_clubs)
+        return len(data)
+
+    def run_in() -> int:
+        for p1, p2 in sampled:
+            finder.find_connections_in(db, p1, p2)
+        return len(sampled)
+
+    return [measure("find_player_connections", size, run_player, "pairs", repeat),
+            measure("find_connections_in", size, run_in, "pairs", repeat)]
+
+
+def bench_gui(db: PlayerDatabase, size: int, repeat: int, queries: int, seed: int) -> Optional[Result]:
+    """Completer population as initialize_ui sets it up, offscreen"""
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6 import QtCore, QtWidgets
+        from models import PlayerSearchModel
+    except ImportError:
+        return None
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    rng = random.Random(seed)
+    players = db.get_all_players()
+    texts = [rng.choice(players)[:rng.randint(2, 8)] for _ in range(queries)]
+    db.name_index
+
+    def run() -> int:
+        model = PlayerSearchModel(db)
+        completers = [QtWidgets.QCompleter(model) for _ in range(2)]
+        for text in texts:
+            model.set_query(text)
+            for row in range(model.rowCount()):
+                model.data(model.index(row), QtCore.Qt.ItemDataRole.DisplayRole)
+        app.processEvents()
+        del completers
+        return len(texts)
+    return measure("gui_population", size, run, "queries", repeat)
+
+
+def run_benchmarks(args: argparse.Namespace) -> List[Result]:
+    results = []
+    for size in args.spells:
+        csv_file = dataset(size, args.clubs, args.seed, args.data_dir)
+        print(f"{size} spells: {csv_file}", file=sys.stderr)
+
+        results += bench_load(csv_file, size, args.repeat, args.backends)
+        db = CompactPlayerDatabase(csv_file, use_snapshot=False)
+        results.append(bench_search(db, size, args.repeat, args.queries, args.seed))
+        results += bench_connections(db, size, args.repeat, args.pairs, args.seed)
+        gui = bench_gui(db, size, args.repeat, args.queries, args.seed)
+        if gui is not None:
+            results.append(gui)
+
+        for result in results:
+            if result["size"] == size:
+                print(format_result(result), file=sys.stderr)
+    return results
+
+
+def format_result(result: Result) -> str:
+    return (f"  {result['name']:<28} {result['wall_s'] * 1000:>10.2f} ms  "
+            f"{result['peak_mb']:>9.2f} MB  {result['throughput']:>12,.0f} {result['unit']}/s")
+
+
+def compare(results: List[Result], baseline: List[Result], threshold: float) -> List[str]:
+    """
+    Benchmarks slower than the baseline by more than threshold
+
+    :arg results: This run's results
+    :arg baseline: Results loaded from an earlier run
+    :arg threshold: Allowed slowdown as a fraction, 0.1 for 10%
+    :return: One message per regression
+    """
+    previous = {(result["name"], result["size"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["name"], result["size"]))
+        if before is None or not before["wall_s"]:
+            continue
+        change = result["wall_s"] / before["wall_s"] - 1
+        if change > threshold:
+            regressions.append(f"{result['name']} @ {result['size']}: {before['wall_s'] * 1000:.2f} ms -> "
+                               f"{result['wall_s'] * 1000:.2f} ms (+{change:.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Tm8s hot paths on synthetic data")
+    parser.add_argument("--spells", type=int, nargs="+", default=[10_000, 100_000],
+                        help="dataset sizes in spells (10k-10M)")
+    parser.add_argument("--clubs", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark, best is kept")
+    parser.add_argument("--queries", type=int, default=500, help="search queries per run")
+    parser.add_argument("--pairs", type=int, default=2000, help="player pairs per run")
+    parser.add_argument("--backends", nargs="+", default=["dict", "compact", "snapshot", "sqlite"],
+                        choices=["dict", "compact", "snapshot", "sqlite"])
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(__file__), "data"),
+                        help="where generated CSVs are kept between runs")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="slowdown that counts as a regression (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = run_benchmarks(args)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "clubs": args.clubs,
+            "repeat": args.repeat,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Load test for the Tm8s query server
+
+Opens keep-alive connections to a running server.py, replays a mix of
+search, connection and teammate requests, and reports p50/p99 latency and
+throughput. With --spawn it starts its own server on a free port first, in a
+separate process so the server and the load generator do not share a GIL
+
+usage: python benchmarks/load_test.py --spawn --db players_database.csv --requests 5000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def build_targets(players: List[str], count: int, seed: int) -> List[str]:
+    """A deterministic request mix: half pairs, a quarter searches, a quarter teammates"""
+    rng = random.Random(seed)
+    # A small pool of popular players makes repeated and concurrent identical requests likely
+    popular = rng.sample(players, min(len(players), 50))
+    targets = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.5:
+            p1, p2 = rng.sample(popular, 2)
+            targets.append("/connections?" + urlencode({"p1": p1, "p2": p2}))
+        elif kind < 0.75:
+            name = rng.choice(players)
+            targets.append("/search?" + urlencode({"q": name[:rng.randint(2, 6)], "limit": 10}))
+        else:
+            targets.append("/teammates?" + urlencode({"player": rng.choice(popular)}))
+    return targets
+
+
+async def client(host: str, port: int, queue: "asyncio.Queue[str]", latencies: List[float],
+                 errors: List[str]) -> None:
+    """Send requests from the queue over one keep-alive connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            start = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+
+            status = (await reader.readline()).split(b" ", 2)[1]
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+
+            if status not in (b"200", b"404"):
+                errors.append(f"{status.decode()} {target}")
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, targets: List[str], concurrency: int) -> None:
+    queue: "asyncio.Queue[str]" = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, queue, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"requests:    {len(latencies)} ({len(errors)} errors)")
+    print(f"concurrency: {concurrency}")
+    print(f"throughput:  {len(latencies) / elapsed:.0f} req/s")
+    print(f"p50:         {percentile(0.50):.2f} ms")
+    print(f"p99:         {percentile(0.99):.2f} ms")
+    print(f"mean:        {statistics.fmean(latencies) * 1000:.2f} ms")
+    for error in errors[:5]:
+        print(f"  {error}")
+
+
+def spawn_server(db_file: str, host: str) -> Tuple[subprocess.Popen, int]:
+    """
+    Start server.py in a child process on a free port
+
+    :return: The process, to terminate once the run is over, and its port
+    """
+    server_script = Path(__file__).resolve().parent.parent / "server.py"
+    process = subprocess.Popen([sys.executable, "-u", str(server_script), "--db", db_file,
+                                "--host", host, "--port", "0"],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    match = re.search(r":(\d+) \(", line)
+    if match is None:
+        process.terminate()
+        raise RuntimeError(f"server did not start: {line.strip() or 'no output'}")
+    return process, int(match.group(1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure Tm8s server latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--spawn", action="store_true", help="start a server in a child process")
+    parser.add_argument("--db", default="players_database.csv", help="player CSV for request mix and --spawn")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from compact_database import CompactPlayerDatabase
+    players = CompactPlayerDatabase(args.db).get_all_players()
+
+    process, port = spawn_server(args.db, args.host) if args.spawn else (None, args.port)
+    targets = build_targets(players, args.requests, args.seed)
+    try:
+        asyncio.run(run_load(args.host, port, targets, args.concurrency))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Pair and teammate result caches for Tm8s
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from connections import CancelCheck, Connection, ConnectionFinder, ProgressCallback
+from instrumentation import metrics
+
+
+class LRUCache:
+    """
+    Bounded LRU cache of results computed from the database
+
+    Entries are tagged with the database generation they were computed
+    from; the first lookup after the generation changes empties the cache
+    """
+    def __init__(self, maxsize: int = 1024, name: str = "cache") -> None:
+        """
+        :arg maxsize: Most entries kept before the least recently used is evicted
+        :arg name: Prefix of the cache's metrics counters
+        """
+        self.maxsize = maxsize
+        self.name = name
+        self.generation: Optional[int] = None
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+
+    def get(self, key: Hashable, generation: int) -> Optional[object]:
+        """
+        Look up an entry, counting a hit or a miss
+
+        :arg key: Cache key
+        :arg generation: Current database generation
+        """
+        with self._lock:
+            self._check_generation(generation)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.count(f"{self.name}.hits")
+                return self._entries[key]
+
+            self.misses += 1
+            metrics.count(f"{self.name}.misses")
+            return None
+
+    def peek(self, key: Hashable, generation: int) -> Optional[object]:
+        """Look up an entry without counting it or refreshing its recency"""
+        with self._lock:
+            self._check_generation(generation)
+            return self._entries.get(key)
+
+    def put(self, key: Hashable, value: object, generation: int) -> None:
+        """
+        Store an entry, evicting the least recently used one when full
+
+        :arg key: Cache key
+        :arg value: Value to cache
+        :arg generation: Database generation the value was computed from
+        """
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                metrics.count(f"{self.name}.evictions")
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss, eviction and invalidation counters, the hit rate and the current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "maxsize": self.maxsize
+        }
+
+    def _check_generation(self, generation: int) -> None:
+        if generation != self.generation:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self.generation = generation
+
+
+class PairCache(LRUCache):
+    """LRU cache keyed by an unordered player pair"""
+    def __init__(self, maxsize: int = 1024, name: str = "pair_cache") -> None:
+        super().__init__(maxsize, name)
+
+
+    @staticmethod
+    def pair_key(p1: str, p2: str) -> Tuple[str, str]:
+        """The same key for (p1, p2) and (p2, p1)"""
+        return (p1, p2) if p1 <= p2 else (p2, p1)
+
+
+class CachedConnectionFinder(ConnectionFinder):
+    """
+    ConnectionFinder with an LRU cache of pair results in front of it
+
+    Looks players up in its database by name, so it can cache per pair
+    and drop everything when the database reloads. A second, smaller LRU
+    holds whole teammate sets, which prefetch_teammates fills ahead of a
+    search so the pair lookup only has to index into them
+    """
+    def __init__(self, db, maxsize: int = 1024, teammate_maxsize: int = 16) -> None:
+        """
+        :arg db: A loaded PlayerDatabase
+        :arg maxsize: Most pairs kept in the cache
+        :arg teammate_maxsize: Most players whose teammate sets are kept
+        """
+        self.db = db
+        self.cache = PairCache(maxsize)
+        self.teammate_cache = LRUCache(teammate_maxsize, "teammate_cache")
+
+
+    def connections_between(self, p1: str, p2: str, progress: Optional[ProgressCallback] = None,
+                            cancelled: Optional[CancelCheck] = None) -> List[Connection]:
+        """
+        Find connections between two players by name, using the cache
+
+        (p1, p2) and (p2, p1) share one entry; results are returned from p1's side
+
+        :arg p1: First player name
+        :arg p2: Second player name
+        :arg progress: Passed to find_connections_in on a cache miss
+        :arg cancelled: Passed to find_connections_in on a cache miss
+        """
+        key = self.cache.pair_key(p1, p2)
+        generation = self.db.generation
+
+        connections = self.cache.get(key, generation)
+        if connections is None:
+            first, second = key
+            teammates = self.teammate_cache.get(p1, generation) if p1 != p2 else None
+            if teammates is not None:
+                connections = teammates.get(p2, [])
+                if p1 != first:
+                    connections = [connection.swapped() for connection in connections]
+            else:
+                connections = self.find_connections_in(self.db, first, second, progress, cancelled)
+            self.cache.put(key, connections, generation)
+
+        if p1 != key[0]:
+            return [connection.swapped() for connection in connections]
+        return list(connections)
+
+
+    def teammates_of(self, player: str, cancelled: Optional[CancelCheck] = None) -> Dict[str, List[Connection]]:
+        """
+        A player's teammates, from the teammate cache when they were prefetched
+
+        :arg player: The player's name
+        :arg cancelled: Passed to find_teammates on a cache miss
+        :return: Teammate name -> connections, seen from the player's side; do not modify
+        """
+        generation = self.db.generation
+        teammates = self.teammate_cache.get(player, generation)
+        if teammates is None:
+            teammates = self.find_teammates(self.db, player, cancelled)
+            self.teammate_cache.put(player, teammates, generation)
+        return teammates
+
+    def prefetch_teammates(self, player: str, cancelled: Optional[CancelCheck] = None) -> None:
+        """
+        Compute and cache a player's teammates ahead of a search
+
+        Not counted as a cache lookup, so the hit rate shows how often searches found a prefetched set
+
+        :arg player: The player's name
+        :arg cancelled: Polled once per spell; raises SearchCancelled when it returns True
+        """
+        generation = self.db.generation
+        if self.teammate_cache.peek(player, generation) is None:
+            self.teammate_cache.put(player, self.find_teammates(self.db, player, cancelled), generation)
+            metrics.count("teammate_cache.prefetches")
@@ -0,0 +1,242 @@
+"""
+Headless command line interface for Tm8s
+
+Reads one query per line from stdin and writes one result per line to stdout,
+without importing PyQt6. Lines may be JSON objects or CSV rows:
+
+    pairs:      {"p1": "Lionel Messi", "p2": "Luis Suarez"}   or   Lionel Messi,Luis Suarez
+    teammates:  {"player": "Lionel Messi"}                     or   Lionel Messi
+    connected:  {"p1": "Lionel Messi", "p2": "Luis Suarez"}   or   Lionel Messi,Luis Suarez
+
+The stats mode reads no input and writes one JSON summary of the whole
+teammate graph: components, most connected and most central players
+
+usage: python cli.py pairs < pairs.jsonl > connections.jsonl
+       python cli.py teammates --format csv --workers 4 < players.txt
+       python cli.py teammates --db "leagues/*.csv" < players.txt
+       python cli.py stats --top 20
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from compact_database import CompactPlayerDatabase
+from components import graph_stats
+from connections import ConnectionFinder
+from database import PlayerDatabase
+from graph_build import load_graph
+from instrumentation import metrics
+from paths import TeammateGraph
+from shards import ShardedPlayerDatabase, is_sharded
+
+FIELDS = {"pairs": ("p1", "p2"), "teammates": ("player",), "connected": ("p1", "p2")}
+
+CSV_COLUMNS = {
+    "pairs": ("p1", "p2", "club", "overlap_start", "overlap_end", "p1_period", "p2_period"),
+    "teammates": ("player", "teammate", "club", "overlap_start", "overlap_end"),
+    "connected": ("p1", "p2", "connected", "component_size")
+}
+
+
+def parse_record(line: str, mode: str) -> Dict[str, str]:
+    """
+    Parse one input line into named fields
+
+    :arg line: A JSON object or a CSV row
+    :arg mode: "pairs", "teammates" or "connected"
+    """
+    fields = FIELDS[mode]
+    line = line.strip()
+    if line.startswith("{"):
+        record = json.loads(line)
+    else:
+        record = dict(zip(fields, next(csv.reader([line]))))
+
+    missing = [field for field in fields if not record.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    return {field: str(record[field]).strip() for field in fields}
+
+
+def answer(db, finder: ConnectionFinder, mode: str, record: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Answer one query
+
+    :arg db: A loaded PlayerDatabase
+    :arg finder: The connection finder to use
+    :arg mode: "pairs", "teammates" or "connected"
+    :arg record: Fields from parse_record
+    """
+    unknown = [name for name in record.values() if name not in db.players_db]
+    if unknown:
+        return {**record, "error": f"unknown player: {', '.join(unknown)}"}
+
+    if mode == "pairs":
+        connections = finder.find_connections_in(db, record["p1"], record["p2"])
+        return {**record, "connections": [connection._asdict() for connection in connections]}
+
+    if mode == "connected":
+        return {**record, "connected": db.connected(record["p1"], record["p2"]),
+                "component_size": db.components.component_size(record["p1"])}
+
+    teammates = finder.find_teammates(db, record["player"])
+    return {**record, "teammates": [
+        {"name": name, **connection._asdict()}
+        for name, connections in sorted(teammates.items())
+        for connection in connections
+    ]}
+
+
+def answer_lines(db, finder: ConnectionFinder, mode: str, lines: List[str]) -> List[Dict[str, Any]]:
+    """Parse and answer a chunk of input lines, turning bad lines into error results"""
+    results = []
+    for line in lines:
+        try:
+            results.append(answer(db, finder, mode, parse_record(line, mode)))
+        except (ValueError, KeyError) as e:
+            results.append({"error": str(e), "input": line.rstrip("\n")})
+    return results
+
+
+_worker_db = None
+_worker_finder: Optional[ConnectionFinder] = None
+
+
+def _init_worker(db_class, csv_file: str) -> None:
+    """Load the database once per pool process"""
+    global _worker_db, _worker_finder
+    _worker_db = db_class(csv_file, index_names=False)
+    _worker_finder = ConnectionFinder()
+
+
+def _answer_chunk(mode: str, lines: List[str]) -> List[Dict[str, Any]]:
+    return answer_lines(_worker_db, _worker_finder, mode, lines)
+
+
+def stream_results(lines: Iterable[str], mode: str, db_class, csv_file: str,
+                   workers: int = 0, chunk_size: int = 256) -> Iterator[Dict[str, Any]]:
+    """
+    Answer input lines in order, holding at most a few chunks in memory
+
+    :arg lines: Input lines, read lazily
+    :arg mode: "pairs", "teammates" or "connected"
+    :arg db_class: PlayerDatabase implementation to load
+    :arg csv_file: Path to the player CSV
+    :arg workers: Process pool size; 0 answers in this process
+    :arg chunk_size: Lines per unit of work sent to the pool
+    """
+    lines = (line for line in lines if line.strip())
+
+    if workers <= 0:
+        db = db_class(csv_file, index_names=False)
+        finder = ConnectionFinder()
+        for line in lines:
+            yield from answer_lines(db, finder, mode, [line])
+        return
+
+    chunks = iter(lambda: list(islice(lines, chunk_size)), [])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(db_class, csv_file)) as pool:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_answer_chunk, mode, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_result(result: Dict[str, Any], mode: str, output_format: str, out) -> None:
+    """
+    Write one result as a JSON line, or as one CSV row per connection
+
+    :arg result: Result from answer()
+    :arg mode: "pairs", "teammates" or "connected"
+    :arg output_format: "jsonl" or "csv"
+    :arg out: Text stream to write to
+    """
+    if output_format == "jsonl":
+        out.write(json.dumps(result, ensure_ascii=False))
+        out.write("\n")
+        return
+
+    if "error" in result:
+        print(f"Error: {result['error']}", file=sys.stderr)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if mode == "connected":
+        writer.writerow((result["p1"], result["p2"], result["connected"], result["component_size"]))
+    elif mode == "pairs":
+        for connection in result["connections"]:
+            writer.writerow((result["p1"], result["p2"], connection["club_name"],
+                             connection["overlap_start"], connection["overlap_end"],
+                             f"{connection['p1_start']}-{connection['p1_end']}",
+                             f"{connection['p2_start']}-{connection['p2_end']}"))
+    else:
+        for teammate in result["teammates"]:
+            writer.writerow((result["player"], teammate["name"], teammate["club_name"],
+                             teammate["overlap_start"], teammate["overlap_end"]))
+    out.write(buffer.getvalue())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="tm8s", description="Stream Tm8s lookups from stdin to stdout")
+    parser.add_argument("mode", choices=sorted(FIELDS) + ["stats"],
+                        help="query type of each input line, or stats for a graph summary")
+    parser.add_argument("--db", default="players_database.csv", help="player CSV file, or a directory or glob of CSV shards")
+    parser.add_argument("--format", dest="output_format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = none)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="lines per unit of work")
+    parser.add_argument("--no-compact", action="store_true",
+                        help="use the dict-based PlayerDatabase instead of the columnar store")
+    parser.add_argument("--top", type=int, default=10, help="stats: length of each ranking")
+    parser.add_argument("--samples", type=int, default=64,
+                        help="stats: BFS sources for the centrality estimate")
+    parser.add_argument("--seed", type=int, default=0, help="stats: seed for picking the BFS sources")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write timings and counters as JSON (this process only, so best with --workers 0)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    db_class = PlayerDatabase if args.no_compact else CompactPlayerDatabase
+    if is_sharded(args.db):
+        db_class = ShardedPlayerDatabase
+    out = sys.stdout
+    if args.metrics:
+        metrics.enabled = True
+
+    if args.mode == "stats":
+        db = db_class(args.db, index_names=False)
+        graph = load_graph(db) or TeammateGraph.from_database(db)
+        out.write(json.dumps(graph_stats(db.components, graph, args.top, args.samples, args.seed),
+                             ensure_ascii=False, indent=2) + "\n")
+    else:
+        if args.output_format == "csv":
+            out.write(",".join(CSV_COLUMNS[args.mode]) + "\n")
+
+        # Flushed per result, so a process on the other end of a pipe gets each answer as it is ready
+        for result in stream_results(sys.stdin, args.mode, db_class, args.db,
+                                     args.workers, args.chunk_size):
+            write_result(result, args.mode, args.output_format, out)
+            out.flush()
+    out.flush()
+
+    if args.metrics:
+        metrics.dump(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+Columnar, interned storage backend for Tm8s player careers
+"""
+
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from database import ClubIndex, CsvRow, DatabaseState, PlayerDatabase
+from instrumentation import metrics
+from snapshot import CsvStamp, load_snapshot, write_snapshot
+
+
+class CareerView(Mapping):
+    """
+    Read-only dict-like view of a ColumnStore
+
+    Lets code written against PlayerDatabase.players_db (membership tests,
+    len(), iteration, lookups) run unchanged over the columnar store
+    """
+    def __init__(self, store: "ColumnStore") -> None:
+        self._store = store
+
+    def __getitem__(self, player_name: str) -> List[Tuple[str, int, int]]:
+        if player_name not in self._store.player_ids:
+            raise KeyError(player_name)
+        return self._store.get_player_data(player_name)
+
+    def __contains__(self, player_name: object) -> bool:
+        return player_name in self._store.player_ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.player_names)
+
+    def __len__(self) -> int:
+        return len(self._store.player_names)
+
+
+class ClubIndexView(Mapping):
+    """
+    Lazy club name -> ClubIndex mapping over a ColumnStore
+
+    Rows for club c are club_order[club_offsets[c]:club_offsets[c + 1]],
+    already sorted by start year
+    """
+    def __init__(self, store: "ColumnStore") -> None:
+        self._store = store
+        self._built: Dict[int, ClubIndex] = {}
+
+    def __getitem__(self, club: str) -> ClubIndex:
+        store = self._store
+        club_id = store.club_ids.get(club)
+        if club_id is None or store.club_offsets[club_id] == store.club_offsets[club_id + 1]:
+            raise KeyError(club)
+
+        index = self._built.get(club_id)
+        if index is None:
+            rows = store.club_order[store.club_offsets[club_id]:store.club_offsets[club_id + 1]]
+            names = store.player_names
+            index = ClubIndex.from_sorted([names[store.player_column[row]] for row in rows],
+                                          array('i', [store.start_column[row] for row in rows]),
+                                          array('i', [store.end_column[row] for row in rows]))
+            self._built[club_id] = index
+        return index
+
+    def __iter__(self) -> Iterator[str]:
+        store = self._store
+        return (club for club_id, club in enumerate(store.club_names)
+                if store.club_offsets[club_id] != store.club_offsets[club_id + 1])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class ColumnStore(DatabaseState):
+    """
+    One loaded version of the columnar data
+
+    Player and club names are interned to integer IDs and every spell lives in
+    contiguous int32 columns (player_id, club_id, start, end) grouped by player.
+    Player i owns rows offsets[i]:offsets[i + 1], in CSV order; club c owns
+    club_order[club_offsets[c]:club_offsets[c + 1]], sorted by start year.
+    Never modified once built
+    """
+    def __init__(self, player_names: List[str], club_names: List[str], offsets: array,
+                 player_column: array, club_column: array, start_column: array, end_column: array,
+                 club_order: array, club_offsets: array, snapshot_mmap=None, stamp: Any = None) -> None:
+        """
+        Wrap prebuilt columns
+
+        :arg player_names: Player names in sorted order, indexed by ID
+        :arg club_names: Club names indexed by ID
+        :arg snapshot_mmap: The snapshot the columns are views of, kept open with them
+        :arg stamp: What the columns were parsed from
+        """
+        self.player_names = player_names
+        self.player_ids = dict(zip(player_names, range(len(player_names))))
+        self.club_names = club_names
+        self.club_ids = dict(zip(club_names, range(len(club_names))))
+        self.offsets = offsets
+        self.player_column = player_column
+        self.club_column = club_column
+        self.start_column = start_column
+        self.end_column = end_column
+        self.club_order = club_order
+        self.club_offsets = club_offsets
+        self.snapshot_mmap = snapshot_mmap
+        super().__init__(CareerView(self), ClubIndexView(self), stamp)
+
+
+    @classmethod
+    def from_rows(cls, names: List[str], clubs: List[str], players: array,
+                  club_column: array, starts: array, ends: array, stamp: Any = None) -> "ColumnStore":
+        """
+        Build a store from interned spells, regrouping rows by sorted player name
+
+        Rows are also sorted by (club, start year) for the lazy club index;
+        each ClubIndex is materialised the first time its club is queried
+
+        :arg names: Player names indexed by the IDs used in players
+        :arg clubs: Club names indexed by the IDs used in club_column
+        :arg players: Player ID of each spell
+        :arg club_column: Club ID of each spell
+        :arg starts: Start year of each spell
+        :arg ends: End year of each spell
+        :arg stamp: What the spells were parsed from
+        """
+        order = sorted(range(len(names)), key=names.__getitem__)
+        rank = array('i', [0]) * len(names)
+        for new_id, old_id in enumerate(order):
+            rank[old_id] = new_id
+
+        offsets = array('q', [0]) * (len(names) + 1)
+        for player_id in players:
+            offsets[rank[player_id] + 1] += 1
+        for i in range(len(names)):
+            offsets[i + 1] += offsets[i]
+
+        count = len(players)
+        player_column = array('i', [0]) * count
+        new_clubs = array('i', [0]) * count
+        new_starts = array('i', [0]) * count
+        new_ends = array('i', [0]) * count
+        cursor = array('q', offsets[:len(names)])
+
+        for row in range(count):
+            player_id = rank[players[row]]
+            slot = cursor[player_id]
+            cursor[player_id] = slot + 1
+            player_column[slot] = player_id
+            new_clubs[slot] = club_column[row]
+            new_starts[slot] = starts[row]
+            new_ends[slot] = ends[row]
+
+        club_order = sorted(range(count), key=lambda row: (new_clubs[row], new_starts[row]))
+        club_offsets = array('q', [0]) * (len(clubs) + 1)
+        for club_id in new_clubs:
+            club_offsets[club_id + 1] += 1
+        for i in range(len(clubs)):
+            club_offsets[i + 1] += club_offsets[i]
+
+        return cls([names[old_id] for old_id in order], clubs, offsets, player_column, new_clubs,
+                   new_starts, new_ends, array('i', club_order), club_offsets, stamp=stamp)
+
+
+    def get_all_players(self) -> List[str]:
+        """Get list of all player names"""
+        return list(self.player_names)
+
+    def get_player_data(self, player_name: str) -> List[Tuple[str, int, int]]:
+        """
+        Get club history for a player
+
+        :arg player_name: The name of the player to retrieve
+        """
+        player_id = self.player_ids.get(player_name)
+        if player_id is None:
+            return []
+
+        clubs = self.club_names
+        first, last = self.offsets[player_id], self.offsets[player_id + 1]
+        return [(clubs[club_id], start_year, end_year)
+                for club_id, start_year, end_year in zip(self.club_column[first:last],
+                                                         self.start_column[first:last],
+                                                         self.end_column[first:last])]
+
+    def get_player_rows(self, player_name: str) -> range:
+        """
+        Get the row range of a player's spells in the columns
+
+        :arg player_name: The name of the player
+        """
+        player_id = self.player_ids.get(player_name)
+        if player_id is None:
+            return range(0)
+        return range(self.offsets[player_id], self.offsets[player_id + 1])
+
+
+class CompactPlayerDatabase(PlayerDatabase):
+    """
+    Compact Player Database for Tm8s
+
+    Holds its data in a ColumnStore, replaced as a whole on reload.
+    Exposes the same API as PlayerDatabase
+
+    After a successful CSV parse the columns are saved to a binary snapshot,
+    which later launches memory-map instead of re-parsing the CSV
+    """
+    def __init__(self, csv_file: str = "players_database.csv", use_snapshot: bool = True,
+                 index_names: bool = True) -> None:
+        """
+        Initialize the compact player database
+
+        :param csv_file: The path to the CSV file containing player data ("players_database.csv")
+        :param use_snapshot: Read and write the binary snapshot cache next to the CSV
+        :param index_names: Build the name search index with each load, on the loading thread
+        """
+        self.use_snapshot = use_snapshot
+        super().__init__(csv_file, index_names)
+
+
+    @metrics.timer("load_database")
+    def load_database(self) -> None:
+        """
+        Load player data from CSV file into the columnar store
+
+        columns: "Player Name", "Club", "Start Year", "End Year"
+        Uses the snapshot instead when it is still valid for the CSV
+        """
+        if self.use_snapshot:
+            try:
+                columns = load_snapshot(self)
+                if columns is not None:
+                    metrics.count("snapshot_loads")
+                    self.install_state(ColumnStore(**columns))
+                    self.generation += 1
+                    return
+            except Exception as e:
+                metrics.error("load_snapshot", e)
+
+        try:
+            rows, stamp = self.read_rows()
+            self.install_rows(rows, stamp, keep_loaded=False)
+        except Exception as e:
+            metrics.error("load_database", e)
+            self.install_state(ColumnStore.from_rows([], [], array('i'), array('i'), array('i'), array('i')))
+        self.generation += 1
+
+
+    def apply_appended_rows(self, rows: List[CsvRow], stamp: CsvStamp) -> None:
+        """Add rows appended to the CSV to the loaded columns, without re-parsing the rest"""
+        self.install_rows(rows, stamp, keep_loaded=True)
+
+    def apply_rewrite(self) -> None:
+        """Re-parse the changed CSV into new columns"""
+        rows, stamp = self.read_rows()
+        self.install_rows(rows, stamp, keep_loaded=False)
+
+    def install_rows(self, rows: Iterable[CsvRow], stamp: Any, keep_loaded: bool) -> None:
+        """
+        Build a new store and swap it in
+
+        The store carries the stamp of the CSV bytes the rows came from, and
+        a new snapshot stamped the same way is saved so the next launch is current
+
+        :arg rows: Parsed CSV rows to add
+        :arg stamp: What the rows, and the loaded rows when kept, were parsed from
+        :arg keep_loaded: Start from the loaded rows instead of an empty store
+        """
+        if keep_loaded:
+            store = self.state
+            names = list(store.player_names)
+            clubs = list(store.club_names)
+            players = array('i', store.player_column)
+            club_column = array('i', store.club_column)
+            starts = array('i', store.start_column)
+            ends = array('i', store.end_column)
+        else:
+            names, clubs = [], []
+            players, club_column, starts, ends = array('i'), array('i'), array('i'), array('i')
+        name_ids = {name: i for i, name in enumerate(names)}
+        club_ids = {club: i for i, club in enumerate(clubs)}
+
+        added = 0
+        for player_name, club, start_year, end_year in rows:
+            player_id = name_ids.get(player_name)
+            if player_id is None:
+                player_id = name_ids[player_name] = len(names)
+                names.append(player_name)
+
+            club_id = club_ids.get(club)
+            if club_id is None:
+                club_id = club_ids[club] = len(clubs)
+                clubs.append(club)
+
+            players.append(player_id)
+            club_column.append(club_id)
+            starts.append(start_year)
+            ends.append(end_year)
+            added += 1
+        if not keep_loaded:
+            metrics.count("rows_parsed", added)
+
+        new_store = ColumnStore.from_rows(names, clubs, players, club_column, starts, ends, stamp)
+        if keep_loaded and len(names) == len(store.player_names):
+            new_store.name_index = store.name_index
+        self.install_state(new_store)
+
+        if self.use_snapshot:
+            try:
+                write_snapshot(self)
+            except Exception as e:
+                metrics.error("write_snapshot", e)
+
+
+    def get_player_rows(self, player_name: str) -> range:
+        """
+        Get the row range of a player's spells in the columns
+
+        :arg player_name: The name of the player
+        """
+        return self.state.get_player_rows(player_name)
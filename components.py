@@ -0,0 +1,251 @@
+"""
+Connectivity analytics for Tm8s
+
+Union-find over players answers "are these two connected at all?" and
+gives component sizes; degree and sampled-BFS centrality rank the most
+connected players of a TeammateGraph
+"""
+
+import heapq
+import random
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence
+
+from instrumentation import metrics
+
+
+class Components:
+    """
+    Union-find over players, joined whenever two spells overlap at a club
+
+    Uses the same overlap rule as ConnectionFinder, max(start) < min(end),
+    so two players are in one component exactly when some chain of
+    teammates links them
+    """
+    def __init__(self, generation: int = 0) -> None:
+        """
+        :arg generation: The database generation this was built from
+        """
+        self.generation = generation
+        self.ids: Dict[str, int] = {}
+        self.parent = array('i')
+        self.size = array('i')
+        self.count = 0
+
+
+    @classmethod
+    @metrics.timer("build_components")
+    def from_database(cls, db) -> "Components":
+        """
+        Build the components in one sweep over a PlayerDatabase's club index
+
+        :arg db: A loaded PlayerDatabase
+        """
+        components = cls(db.generation)
+        state = db.state
+        for player in state.get_all_players():
+            components.add(player)
+        for index in state.club_index.values():
+            components.add_club(index.players, index.starts, index.ends)
+        return components
+
+
+    def extended(self, db, rows: Iterable[Sequence], generation: int) -> "Components":
+        """
+        A copy with newly loaded spells joined in, for rows appended to the CSV
+
+        Union-find cannot split components, so anything other than an append needs from_database
+
+        :arg db: The database, already holding the rows
+        :arg rows: New (player, club, start_year, end_year) rows
+        :arg generation: The database generation including the rows
+        """
+        components = Components(generation)
+        components.ids = dict(self.ids)
+        components.parent = array('i', self.parent)
+        components.size = array('i', self.size)
+        components.count = self.count
+
+        for player, club, start_year, end_year in rows:
+            player_id = components.add(player)
+            if start_year >= end_year:
+                continue
+            for other, _, _ in db.get_overlapping_players(club, start_year, end_year):
+                components.union(player_id, components.add(other))
+        return components
+
+
+    def add(self, player: str) -> int:
+        """ID of a player, adding them as their own component when new"""
+        player_id = self.ids.get(player)
+        if player_id is None:
+            player_id = self.ids[player] = len(self.parent)
+            self.parent.append(player_id)
+            self.size.append(1)
+            self.count += 1
+        return player_id
+
+    def find(self, player_id: int) -> int:
+        """Root of a player's component, halving the path on the way"""
+        parent = self.parent
+        while parent[player_id] != player_id:
+            parent[player_id] = parent[parent[player_id]]
+            player_id = parent[player_id]
+        return player_id
+
+    def union(self, a: int, b: int) -> bool:
+        """
+        Join the components of two players, the smaller under the larger
+
+        :return: True when they were not yet connected
+        """
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        self.count -= 1
+        return True
+
+    def add_club(self, players: Sequence[str], starts: Sequence[int], ends: Sequence[int]) -> None:
+        """
+        Join every pair of overlapping spells at one club
+
+        Spells are swept in start-year order. The spells still active at a
+        start year all cover it, so they are already one component, and the
+        new spell only needs joining to one of them
+
+        :arg players: Player of each spell, sorted by start year
+        :arg starts: Start years, ascending
+        :arg ends: End years
+        """
+        active: List[tuple] = []
+        for player, start_year, end_year in zip(players, starts, ends):
+            while active and active[0][0] <= start_year:
+                heapq.heappop(active)
+            if start_year >= end_year:
+                continue
+
+            player_id = self.add(player)
+            if active:
+                self.union(player_id, active[0][1])
+            heapq.heappush(active, (end_year, player_id))
+
+
+    def __len__(self) -> int:
+        """Number of components"""
+        return self.count
+
+    def connected(self, p1: str, p2: str) -> bool:
+        """Whether any chain of teammates links two players"""
+        a = self.ids.get(p1)
+        b = self.ids.get(p2)
+        if a is None or b is None:
+            return False
+        return self.find(a) == self.find(b)
+
+    def component_size(self, player: str) -> int:
+        """Number of players in a player's component, 0 for unknown players"""
+        player_id = self.ids.get(player)
+        if player_id is None:
+            return 0
+        return self.size[self.find(player_id)]
+
+    def component_sizes(self) -> List[int]:
+        """Size of every component, largest first"""
+        return sorted((self.size[i] for i in range(len(self.parent)) if self.parent[i] == i), reverse=True)
+
+
+def most_connected(graph, k: int = 10) -> List[tuple]:
+    """
+    Players with the most distinct teammates
+
+    :arg graph: A TeammateGraph
+    :arg k: Number of players
+    :return: (name, teammates) pairs, most first
+    """
+    top = heapq.nlargest(k, range(len(graph)), key=graph.degree)
+    return [(graph.names[i], graph.degree(i)) for i in top]
+
+
+@metrics.timer("approximate_centrality")
+def approximate_centrality(graph, samples: int = 64, seed: int = 0) -> array:
+    """
+    Estimate every player's harmonic closeness centrality
+
+    Runs a BFS from a random sample of players and scales the summed
+    1 / distance up to the whole graph, so the cost is samples BFS passes
+    rather than one per player
+
+    :arg graph: A TeammateGraph
+    :arg samples: Number of BFS sources
+    :arg seed: Seed for picking the sources
+    :return: Centrality in [0, 1] indexed by player ID
+    """
+    count = len(graph)
+    scores = array('d', [0.0]) * count
+    if count < 2:
+        return scores
+
+    sources = random.Random(seed).sample(range(count), min(samples, count))
+    offsets = graph.offsets
+    neighbors = graph.neighbors
+    distance = array('i', [-1]) * count
+
+    for source in sources:
+        reached = [source]
+        distance[source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            weight = 1.0 / depth
+            next_frontier = []
+            for node in frontier:
+                for slot in range(offsets[node], offsets[node + 1]):
+                    neighbor = neighbors[slot]
+                    if distance[neighbor] < 0:
+                        distance[neighbor] = depth
+                        scores[neighbor] += weight
+                        next_frontier.append(neighbor)
+            reached.extend(next_frontier)
+            frontier = next_frontier
+
+        for node in reached:
+            distance[node] = -1
+
+    scale = count / (len(sources) * (count - 1))
+    for i in range(count):
+        scores[i] *= scale
+    return scores
+
+
+def graph_stats(components: Components, graph, top: int = 10, samples: int = 64,
+                seed: int = 0) -> Dict[str, Any]:
+    """
+    Graph-wide summary: components, most connected and most central players
+
+    :arg components: Components of the database
+    :arg graph: The TeammateGraph of the same database
+    :arg top: Length of each ranking
+    :arg samples: BFS sources for the centrality estimate
+    :arg seed: Seed for picking the sources
+    """
+    sizes = components.component_sizes()
+    centrality = approximate_centrality(graph, samples, seed)
+    central = heapq.nlargest(top, range(len(graph)), key=centrality.__getitem__)
+
+    return {
+        "players": len(graph),
+        "teammate_pairs": len(graph.neighbors) // 2,
+        "components": len(components),
+        "isolated_players": sum(1 for size in sizes if size == 1),
+        "largest_components": sizes[:top],
+        "most_connected": [{"name": name, "teammates": teammates}
+                           for name, teammates in most_connected(graph, top)],
+        "most_central": [{"name": graph.names[i], "centrality": round(centrality[i], 4)} for i in central],
+        "centrality_samples": min(samples, len(graph))
+    }
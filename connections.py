@@ -2,7 +2,69 @@
 Connection finder module for Tm8s
 """
 
-from typing import Dict, List, Tuple, Any, Optional
+import heapq
+from operator import attrgetter
+from typing import Dict, Iterator, List, Tuple, Any, Optional, Callable, NamedTuple, Union
+
+from instrumentation import metrics
+
+ProgressCallback = Callable[[int, int], None]
+CancelCheck = Callable[[], bool]
+
+
+class SearchCancelled(Exception):
+    """Raised by a search when its cancel check returns True"""
+
+
+class Connection(NamedTuple):
+    """
+    A period two players shared at one club
+
+    Stored as plain ints; the period strings are only built when displayed
+    """
+    club_name: str
+    overlap_start: int
+    overlap_end: int
+    p1_start: int
+    p1_end: int
+    p2_start: int
+    p2_end: int
+
+    @property
+    def overlap_years(self) -> int:
+        return self.overlap_end - self.overlap_start
+
+    @property
+    def p1_period(self) -> str:
+        return f"{self.p1_start}-{self.p1_end}"
+
+    @property
+    def p2_period(self) -> str:
+        return f"{self.p2_start}-{self.p2_end}"
+
+    def swapped(self) -> "Connection":
+        """The same connection seen from player 2's side"""
+        return self._replace(p1_start=self.p2_start, p1_end=self.p2_end,
+                             p2_start=self.p1_start, p2_end=self.p1_end)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Dictionary form returned by find_player_connections"""
+        return {
+            "club_name": self.club_name,
+            "overlap_start": self.overlap_start,
+            "overlap_end": self.overlap_end,
+            "p1_period": self.p1_period,
+            "p2_period": self.p2_period,
+            "overlapped": True
+        }
+
+
+class Teammate(NamedTuple):
+    """Everyone a player overlapped with, summed over every shared spell"""
+    name: str
+    shared_years: int
+    connections: List[Connection]
+
 
 class ConnectionFinder:
     """
@@ -11,33 +73,165 @@ class ConnectionFinder:
     Finds connection between two players based on clubs they played for in overlapping time periods
     """
 
-    def find_player_connections(self, p1_clubs, p2_clubs):
+    @metrics.timer("find_connections")
+    def find_connections(self, p1_clubs, p2_clubs, progress: Optional[ProgressCallback] = None,
+                         cancelled: Optional[CancelCheck] = None) -> List[Connection]:
         """
         Finds connections between two players based on their club histories
+
+        Player 2's spells are hashed by club, so each of player 1's spells only
+        meets spells at the same club. Results keep player 1's spell order
         :arg p1_clubs: List of (club, start_year, end_year) for player 1
         :arg p2_clubs: List of (club, start_year, end_year) for player 2
+        :arg progress: Called with (spells done, total spells) for player 1
+        :arg cancelled: Polled once per spell; raises SearchCancelled when it returns True
         """
+        p2_by_club: Dict[str, List[Tuple[int, int]]] = {}
+        for p2_club, p2_start, p2_end in p2_clubs:
+            p2_by_club.setdefault(p2_club, []).append((p2_start, p2_end))
+
         connections = []
+        compared = 0
 
-        for p1_club, p1_start, p1_end in p1_clubs:
-            for p2_club, p2_start, p2_end in p2_clubs:
-                if p1_club == p2_club:
-                    overlap_start = max(p1_start, p2_start)
-                    overlap_end = min(p1_end, p2_end)
-
-                    if overlap_start < overlap_end:
-                        connections.append({
-                            "club_name": p1_club,
-                            "overlap_start": overlap_start,
-                            "overlap_end": overlap_end,
-                            "p1_period": f"{p1_start}-{p1_end}",
-                            "p2_period": f"{p2_start}-{p2_end}",
-                            "overlapped": True
-                        })
+        for done, (p1_club, p1_start, p1_end) in enumerate(p1_clubs):
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            if progress is not None:
+                progress(done, len(p1_clubs))
 
+            candidates = p2_by_club.get(p1_club, ())
+            compared += len(candidates)
+            for p2_start, p2_end in candidates:
+                overlap_start = max(p1_start, p2_start)
+                overlap_end = min(p1_end, p2_end)
+
+                if overlap_start < overlap_end:
+                    connections.append(Connection(p1_club, overlap_start, overlap_end,
+                                                  p1_start, p1_end, p2_start, p2_end))
+
+        metrics.count("pairs_compared", compared)
         return connections
 
 
+    def find_player_connections(self, p1_clubs, p2_clubs, progress: Optional[ProgressCallback] = None,
+                                cancelled: Optional[CancelCheck] = None) -> List[Dict[str, Any]]:
+        """
+        Finds connections between two players as dictionaries
+
+        Adapter over find_connections for display code that expects
+        "club_name", "overlap_start", "overlap_end", "p1_period" and "p2_period" keys
+        :arg p1_clubs: List of (club, start_year, end_year) for player 1
+        :arg p2_clubs: List of (club, start_year, end_year) for player 2
+        :arg progress: Called with (spells done, total spells) for player 1
+        :arg cancelled: Polled once per spell; raises SearchCancelled when it returns True
+        """
+        return [connection.as_dict()
+                for connection in self.find_connections(p1_clubs, p2_clubs, progress, cancelled)]
+
+
+    @metrics.timer("find_connections_in")
+    def find_connections_in(self, db, p1: str, p2: str, progress: Optional[ProgressCallback] = None,
+                            cancelled: Optional[CancelCheck] = None) -> List[Connection]:
+        """
+        Finds connections between two players looked up by name in a database
+
+        Pushed down to the database when it can join spells itself (query_connections)
+        :arg db: A loaded PlayerDatabase
+        :arg p1: First player name
+        :arg p2: Second player name
+        :arg progress: Called with (spells done, total spells) for player 1
+        :arg cancelled: Polled once per spell; raises SearchCancelled when it returns True
+        """
+        if hasattr(db, "query_connections"):
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            return db.query_connections(p1, p2)
+
+        state = db.state
+        return self.find_connections(state.get_player_data(p1), state.get_player_data(p2), progress, cancelled)
+
+
+    @metrics.timer("find_teammates")
+    def find_teammates(self, db, player: str, cancelled: Optional[CancelCheck] = None) -> Dict[str, List[Connection]]:
+        """
+        Finds everyone who overlapped with a player, with each shared period
+
+        Each of the player's spells is a window query on that club's interval index,
+        or a single SQL join when the database can run one (query_teammates)
+        :arg db: A loaded PlayerDatabase
+        :arg player: The player's name
+        :arg cancelled: Polled once per spell; raises SearchCancelled when it returns True
+        :return: Teammate name -> connections, seen from the player's side
+        """
+        teammates: Dict[str, List[Connection]] = {}
+
+        if hasattr(db, "query_teammates"):
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            for teammate, connection in db.query_teammates(player):
+                teammates.setdefault(teammate, []).append(connection)
+            return teammates
+
+        state = db.state
+        for club, start_year, end_year in state.get_player_data(player):
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            for teammate, other_start, other_end in state.get_overlapping_players(club, start_year, end_year):
+                if teammate == player:
+                    continue
+                teammates.setdefault(teammate, []).append(Connection(
+                    club, max(start_year, other_start), min(end_year, other_end),
+                    start_year, end_year, other_start, other_end))
+
+        return teammates
+
+
+    def rank_teammates(self, teammates: Dict[str, List[Connection]], k: Optional[int] = None) -> List[Teammate]:
+        """
+        Rank teammates by total shared years, most first
+
+        Picks the top k with a heap instead of sorting everyone; ties keep
+        the order teammates were found in
+        :arg teammates: Teammate name -> connections, as from find_teammates
+        :arg k: How many to return, None for all
+        """
+        summaries = self.summarize_teammates(teammates)
+        if k is None:
+            return sorted(summaries, key=attrgetter("shared_years"), reverse=True)
+        return heapq.nlargest(k, summaries, key=attrgetter("shared_years"))
+
+    def ranking_heap(self, teammates: Dict[str, List[Connection]]) -> List[Tuple[int, int, Teammate]]:
+        """
+        Teammates in a heap that pops them most shared years first
+
+        Heapifying is linear, so a long list shown a page at a time only pays
+        for the pages popped; ties pop in the order teammates were found in
+        :arg teammates: Teammate name -> connections, as from find_teammates
+        :return: (-shared years, found order, Teammate) entries for heapq.heappop
+        """
+        heap = [(-teammate.shared_years, order, teammate)
+                for order, teammate in enumerate(self.summarize_teammates(teammates))]
+        heapq.heapify(heap)
+        return heap
+
+    def summarize_teammates(self, teammates: Dict[str, List[Connection]]) -> Iterator[Teammate]:
+        """Each teammate with their total shared years, in the order found"""
+        return (Teammate(name, sum(self.calculate_overlap_years(c.overlap_start, c.overlap_end)
+                                   for c in connections), connections)
+                for name, connections in teammates.items())
+
+    @metrics.timer("top_teammates")
+    def top_teammates(self, db, player: str, k: Optional[int] = 50) -> List[Teammate]:
+        """
+        The k teammates a player shared the most years with
+
+        :arg db: A loaded PlayerDatabase
+        :arg player: The player's name
+        :arg k: How many to return, None for all
+        """
+        return self.rank_teammates(self.find_teammates(db, player), k)
+
+
     def calculate_overlap_years(self, overlap_start: int, overlap_end: int) -> int:
         """
         Calculate overlap years
@@ -48,22 +242,21 @@ class ConnectionFinder:
         return overlap_end - overlap_start
 
 
-    def format_connection_result(self, connection: Dict, p1: str, p2: str) -> str:
+    def format_connection_result(self, connection: Union[Connection, Dict], p1: str, p2: str) -> str:
         """
         Formats connection result for display in TextEdit box
 
+        :arg connection: A Connection or a dictionary from find_player_connections
         :arg p1: First player name
         :arg p2: Second player name
         """
-        club = connection['club_name']
-        overlap_start = connection['overlap_start']
-        overlap_end = connection['overlap_end']
-        p1_period = connection['p1_period']
-        p2_period = connection['p2_period']
-
-        result = f"{club}\n"
-        result += f"✓ Played together: {overlap_start}-{overlap_end}\n"
-        result += f"{p1} at club: {p1_period}\n"
-        result += f"{p2} at club: {p2_period}\n"
+        if isinstance(connection, Connection):
+            connection = connection.as_dict()
 
-        return result
\ No newline at end of file
+        return "\n".join([
+            connection['club_name'],
+            f"✓ Played together: {connection['overlap_start']}-{connection['overlap_end']}",
+            f"{p1} at club: {connection['p1_period']}",
+            f"{p2} at club: {connection['p2_period']}",
+            ""
+        ])
@@ -2,55 +2,452 @@
 Handles player data loading & searching
 """
 
+import copy
 import csv
+import hashlib
+import io
+import os
+from array import array
+from bisect import bisect_left, bisect_right
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from components import Components
+from instrumentation import metrics
+from search_index import NameIndex
+from snapshot import CsvStamp, file_digest, file_hash
+
+# One parsed CSV row: (player, club, start_year, end_year)
+CsvRow = Tuple[str, str, int, int]
+
+
+class ClubIndex:
+    """
+    Interval index over every spell at a single club
+
+    Spells are kept in parallel arrays sorted by start year. Together with the
+    longest spell length this bounds an overlap query to a binary-searched window
+    """
+    def __init__(self, spells: List[Tuple[str, int, int]]) -> None:
+        """
+        Build the index for one club
+
+        :arg spells: List of (player, start_year, end_year) at the club
+        """
+        spells = sorted(spells, key=lambda spell: spell[1])
+
+        self.players: List[str] = [player for player, _, _ in spells]
+        self.starts = array('i', [start for _, start, _ in spells])
+        self.ends = array('i', [end for _, _, end in spells])
+        self.max_length = max((end - start for _, start, end in spells), default=0)
+
+    @classmethod
+    def from_sorted(cls, players: List[str], starts, ends) -> "ClubIndex":
+        """
+        Wrap columns that are already sorted by start year
+
+        :arg players: Player name of each spell
+        :arg starts: Start years, ascending
+        :arg ends: End years
+        """
+        index = cls.__new__(cls)
+        index.players = players
+        index.starts = starts
+        index.ends = ends
+        index.max_length = max((end - start for start, end in zip(starts, ends)), default=0)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def overlapping(self, start_year: int, end_year: int) -> List[Tuple[str, int, int]]:
+        """
+        Find spells at this club that overlap a window
+
+        Uses the same rule as ConnectionFinder: two periods overlap when
+        max(start) < min(end)
+
+        :arg start_year: Start of the window
+        :arg end_year: End of the window
+        """
+        # A spell can only reach past start_year if it began within max_length of it
+        low = bisect_right(self.starts, start_year - self.max_length)
+        high = bisect_left(self.starts, end_year)
+
+        results = []
+        for i in range(low, high):
+            spell_start = self.starts[i]
+            spell_end = self.ends[i]
+            if max(spell_start, start_year) < min(spell_end, end_year):
+                results.append((self.players[i], spell_start, spell_end))
+
+        return results
+
+
+def build_club_index(players_db: Mapping[str, List[Tuple[str, int, int]]]) -> Dict[str, ClubIndex]:
+    """
+    Build the per-club interval indexes from careers by player
+
+    :arg players_db: Player name -> list of (club, start_year, end_year)
+    """
+    club_spells: Dict[str, List[Tuple[str, int, int]]] = {}
+    for player_name, clubs in players_db.items():
+        for club, start_year, end_year in clubs:
+            club_spells.setdefault(club, []).append((player_name, start_year, end_year))
+
+    return {club: ClubIndex(spells) for club, spells in club_spells.items()}
+
+
+class DatabaseState:
+    """
+    One loaded version of the player data: careers by player, the per-club
+    indexes, the name search index and the stamp of the CSV they came from
+
+    Never modified once installed. A reload builds a new state and swaps it
+    in with a single assignment, so code that reads db.state once and
+    queries that object sees one consistent version throughout
+    """
+    def __init__(self, players_db: Mapping[str, List[Tuple[str, int, int]]],
+                 club_index: Mapping[str, ClubIndex], stamp: Any = None,
+                 name_index: Optional[NameIndex] = None) -> None:
+        """
+        :arg players_db: Player name -> list of (club, start_year, end_year)
+        :arg club_index: Club name -> ClubIndex
+        :arg stamp: What the data was parsed from, a CsvStamp for a single CSV; None when nothing was
+        :arg name_index: Name search index over these players, None until built
+        """
+        self.players_db = players_db
+        self.club_index = club_index
+        self.stamp = stamp
+        self.name_index = name_index
+
+
+    def replace(self, **changes: Any) -> "DatabaseState":
+        """
+        A copy with some attributes replaced, to install as a new state
+
+        :arg changes: Attribute name -> new value
+        """
+        state = copy.copy(self)
+        for name, value in changes.items():
+            setattr(state, name, value)
+        return state
+
+
+    def get_all_players(self) -> List[str]:
+        """Get list of all player names"""
+        return sorted(self.players_db.keys())
+
+    def get_player_data(self, player_name: str) -> List[Tuple[str, int, int]]:
+        """
+        Get club history for a player
+
+        :arg player_name: The name of the player to retrieve
+        """
+        return self.players_db.get(player_name, [])
+
+    def get_all_clubs(self) -> List[str]:
+        """Get list of all club names"""
+        return sorted(self.club_index.keys())
+
+    def get_overlapping_players(self, club: str, start_year: int, end_year: int) -> List[Tuple[str, int, int]]:
+        """
+        Get every player whose spell at a club overlaps a time window
+
+        :arg club: The club name
+        :arg start_year: Start of the window
+        :arg end_year: End of the window
+        :return: List of (player, start_year, end_year) spells at the club
+        """
+        index = self.club_index.get(club)
+        if index is None:
+            return []
+
+        return index.overlapping(start_year, end_year)
+
 
 class PlayerDatabase:
     """
     Player Database manager for Tm8s
 
-    Manages loading, storing, searching player info from CSV file
+    Manages loading, storing, searching player info from CSV file.
+    The loaded data lives in one DatabaseState, replaced as a whole on reload
     """
-    def __init__(self, csv_file: str = "players_database.csv") -> None:
+    def __init__(self, csv_file: str = "players_database.csv", index_names: bool = True) -> None:
         """
         Initialize the player database
         :param csv_file: The path to the CSV file containing player data ("players_database.csv")
+        :param index_names: Build the name search index with each load, on the loading thread
         """
 
         self.csv_file = csv_file
-        self.players_db: Dict[str, List[tuple[str, int, int]]] = {}
+        self.index_names = index_names
+        self.state = DatabaseState({}, {})
+        self._components: Optional[Components] = None
+
+        # Bumped on every (re)load so caches built on this data can tell they are stale
+        self.generation = 0
         self.load_database()
 
 
+    @metrics.timer("load_database")
     def load_database(self) -> None:
         """
         Load player data from CSV file
 
         columns: "Player Name", "Club", "Start Year", "End Year"
         Current clubs are currently hard-coded as 2025
+        Replaces whatever was loaded before; use reload() to apply only what changed
         """
+        players_db: Dict[str, List[Tuple[str, int, int]]] = {}
+        stamp = None
         try:
-            with open(self.csv_file, 'r', newline='') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    player_name = row['Player Name']
-                    club = row['Club']
-                    start_year = int(row['Start Year'])
-                    end_year = int(row['End Year'])
+            rows, stamp = self.read_rows()
+            count = 0
+            for player_name, club, start_year, end_year in rows:
+                if player_name not in players_db:
+                    players_db[player_name] = []
+
+                players_db[player_name].append((club, start_year, end_year))
+                count += 1
+
+            metrics.count("rows_parsed", count)
+        except Exception as e:
+            metrics.error("load_database", e)
 
-                    if player_name not in self.players_db:
-                        self.players_db[player_name] = []
+        self.install_state(DatabaseState(players_db, build_club_index(players_db), stamp))
+        self.generation += 1
 
-                    self.players_db[player_name].append((club, start_year, end_year))
 
+    def install_state(self, state: DatabaseState) -> None:
+        """
+        Publish a fully built state with a single assignment
+
+        Builds the state's name search index first when it has none, so a
+        reload on a worker thread leaves nothing for the next search to rebuild
+
+        :arg state: The new state, with its stamp in place
+        """
+        if state.name_index is None and self.index_names:
+            # Not published yet, so no reader can see it half built
+            state.name_index = NameIndex(state.get_all_players())
+        self.state = state
+
+    def csv_change(self, state: DatabaseState) -> Optional[str]:
+        """
+        How the CSV changed since a state was parsed from it
+
+        :arg state: The loaded state, whose stamp is compared with the file
+        :return: None when unchanged, "append" when rows were only added at
+            the end, otherwise "rewrite"
+        """
+        stamp = state.stamp
+        stat = os.stat(self.csv_file)
+        if stamp is None:
+            return "rewrite"
+        if stat.st_size == stamp.size and stat.st_mtime_ns == stamp.mtime_ns:
+            return None
+
+        if stat.st_size == stamp.size and file_digest(self.csv_file) == stamp.digest:
+            # Touched but not edited
+            self.install_state(state.replace(stamp=stamp._replace(mtime_ns=stat.st_mtime_ns)))
+            return None
+
+        if stamp.size and stat.st_size > stamp.size:
+            with open(self.csv_file, 'rb') as file:
+                file.seek(stamp.size - 1)
+                ends_line = file.read(1) == b"\n"
+            if ends_line and file_digest(self.csv_file, stamp.size) == stamp.digest:
+                return "append"
+        return "rewrite"
+
+    def read_rows(self, offset: int = 0) -> Tuple[Iterator[CsvRow], CsvStamp]:
+        """
+        Parse CSV rows, optionally only those after a byte offset, and stamp exactly the bytes parsed
+
+        The file is read once, up to its size when this starts, so rows
+        appended meanwhile are left for the next reload. An appended range
+        stops at its last complete line, in case a row is still being written
+
+        :arg offset: Byte offset of the first row to read, at a line start; 0 reads the whole file
+        :return: The rows, and the size, mtime and SHA-256 of the file up to the last byte parsed
+        """
+        stat = os.stat(self.csv_file)
+        with open(self.csv_file, 'rb') as file:
+            header = file.readline()
+            file.seek(offset)
+            data = file.read(max(stat.st_size - offset, 0))
+
+        if offset:
+            data = data[:data.rfind(b"\n") + 1]
+            digest = file_hash(self.csv_file, offset)
+        else:
+            digest = hashlib.sha256()
+        digest.update(data)
+
+        text = io.TextIOWrapper(io.BytesIO(data), newline='')
+        fields = None if not offset else next(csv.reader(io.TextIOWrapper(io.BytesIO(header), newline='')))
+        rows = ((row['Player Name'], row['Club'], int(row['Start Year']), int(row['End Year']))
+                for row in csv.DictReader(text, fieldnames=fields))
+        return rows, CsvStamp(offset + len(data), stat.st_mtime_ns, digest.digest())
+
+
+    @metrics.timer("reload")
+    def reload(self) -> bool:
+        """
+        Pick up changes to the CSV without restarting
+
+        Rows appended to an otherwise unchanged file are parsed on their own;
+        any other edit re-parses the file and diffs it against what is loaded.
+        The new state is built on the side and swapped in at once, so readers
+        see either the old data or the new, and the generation is bumped
+
+        :return: True when the data changed
+        """
+        components = self._components
+        state = self.state
+        try:
+            change = self.csv_change(state)
+            if change is None:
+                return False
+
+            if change == "append":
+                rows, stamp = self.read_rows(state.stamp.size)
+                rows = list(rows)
+                if not rows:
+                    # Only part of a row has been written so far
+                    return False
+                metrics.count("rows_parsed", len(rows))
+                self.apply_appended_rows(rows, stamp)
+            else:
+                self.apply_rewrite()
         except Exception as e:
-            print(f"Error: {str(e)}")
+            metrics.error("reload", e)
+            return False
+
+        self.generation += 1
+        if change == "append" and components is not None and components.generation == self.generation - 1:
+            self._components = components.extended(self, rows, self.generation)
+        return True
+
+    def apply_appended_rows(self, rows: List[CsvRow], stamp: CsvStamp) -> None:
+        """
+        Apply rows appended to the CSV as a diff
+
+        :arg rows: The appended rows
+        :arg stamp: The CSV up to the last appended row
+        """
+        changed: Dict[str, List[Tuple[str, int, int]]] = {}
+        for player_name, club, start_year, end_year in rows:
+            if player_name not in changed:
+                changed[player_name] = list(self.players_db.get(player_name, []))
+            changed[player_name].append((club, start_year, end_year))
+        self.apply_changes(changed, stamp)
+
+    def apply_rewrite(self) -> None:
+        """Re-parse the whole CSV and apply the players whose spells differ as a diff"""
+        fresh: Dict[str, List[Tuple[str, int, int]]] = {}
+        count = 0
+        rows, stamp = self.read_rows()
+        for player_name, club, start_year, end_year in rows:
+            fresh.setdefault(player_name, []).append((club, start_year, end_year))
+            count += 1
+        metrics.count("rows_parsed", count)
+
+        old = self.players_db
+        self.apply_changes({player_name: fresh.get(player_name, [])
+                            for player_name in fresh.keys() | old.keys()
+                            if fresh.get(player_name) != old.get(player_name)}, stamp)
+
+    def apply_changes(self, changed: Dict[str, List[Tuple[str, int, int]]], stamp: CsvStamp) -> None:
+        """
+        Replace some players' spells and swap in the updated indexes
+
+        Only the clubs those players played for have their ClubIndex rebuilt.
+        players_db, club_index and the stamp are copied or updated and
+        installed together as a new DatabaseState; the name index carries
+        over when no player was added or removed
+
+        :arg changed: Player name -> complete new spell list; an empty list removes the player
+        :arg stamp: The CSV the changes were parsed from
+        """
+        state = self.state
+        players_db = dict(state.players_db)
+        club_spells: Dict[str, List[Tuple[str, int, int]]] = {}
+        names_changed = False
+
+        for player_name, spells in changed.items():
+            for club, _, _ in players_db.get(player_name, ()):
+                club_spells.setdefault(club, [])
+            for club, start_year, end_year in spells:
+                club_spells.setdefault(club, []).append((player_name, start_year, end_year))
+
+            names_changed = names_changed or (player_name in players_db) != bool(spells)
+            if spells:
+                players_db[player_name] = spells
+            else:
+                players_db.pop(player_name, None)
+
+        club_index = dict(state.club_index)
+        for club, spells in club_spells.items():
+            old = club_index.get(club)
+            if old is not None:
+                spells += [(player_name, start_year, end_year)
+                           for player_name, start_year, end_year in zip(old.players, old.starts, old.ends)
+                           if player_name not in changed]
+            if spells:
+                club_index[club] = ClubIndex(spells)
+            else:
+                club_index.pop(club, None)
+
+        self.install_state(DatabaseState(players_db, club_index, stamp,
+                                         None if names_changed else state.name_index))
+
+
+    @property
+    def players_db(self) -> Mapping[str, List[Tuple[str, int, int]]]:
+        """Player name -> list of (club, start_year, end_year), from the current state"""
+        return self.state.players_db
+
+    @property
+    def club_index(self) -> Mapping[str, ClubIndex]:
+        """Club name -> ClubIndex, from the current state"""
+        return self.state.club_index
+
+    @property
+    def name_index(self) -> NameIndex:
+        """Name search index of the current state, built here only when loads skip it (index_names=False)"""
+        state = self.state
+        if state.name_index is None:
+            # Derived from this state alone, so filling it in keeps the state consistent
+            state.name_index = NameIndex(state.get_all_players())
+        return state.name_index
+
+    @property
+    def components(self) -> Components:
+        """
+        Union-find over players, built on first use for each generation
+
+        Rows appended to the CSV are joined into the existing components on reload instead of rebuilding them
+        """
+        components = self._components
+        if components is None or components.generation != self.generation:
+            components = self._components = Components.from_database(self)
+        return components
+
+    def connected(self, p1: str, p2: str) -> bool:
+        """
+        Whether any chain of teammates links two players
+
+        :arg p1: First player name
+        :arg p2: Second player name
+        """
+        return self.components.connected(p1, p2)
 
 
     def get_all_players(self) -> List[str]:
         """Get list of all player names"""
-        return sorted(self.players_db.keys())
+        return self.state.get_all_players()
 
     def get_player_data(self, player_name: str) -> List[Tuple[str, int, int]]:
         """
@@ -58,10 +455,33 @@ class PlayerDatabase:
 
         :arg player_name: The name of the player to retrieve
         """
-        return self.players_db.get(player_name, [])
+        return self.state.get_player_data(player_name)
+
+    @metrics.timer("search_players")
+    def search_players(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Search for players by partial name
+
+        Matching ignores case and accents, and results are ranked: name prefix,
+        word prefix, anywhere in the name, then close misspellings.
+        An empty query lists every player, as a plain substring match would
+
+        :arg query: Partial player name
+        :arg limit: Maximum number of results, None for all; 0 or less returns nothing
+        """
+        return self.name_index.search(query, limit)
 
-    def search_players(self, query: str) -> List[str]:
-        """Search for players by partial name"""
-        query = query.lower()
-        return [name for name in self.players_db.keys()
-                if query in name.lower()]
\ No newline at end of file
+    def get_all_clubs(self) -> List[str]:
+        """Get list of all club names"""
+        return self.state.get_all_clubs()
+
+    def get_overlapping_players(self, club: str, start_year: int, end_year: int) -> List[Tuple[str, int, int]]:
+        """
+        Get every player whose spell at a club overlaps a time window
+
+        :arg club: The club name
+        :arg start_year: Start of the window
+        :arg end_year: End of the window
+        :return: List of (player, start_year, end_year) spells at the club
+        """
+        return self.state.get_overlapping_players(club, start_year, end_year)
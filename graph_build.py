@@ -0,0 +1,333 @@
+"""
+Offline teammate graph build for Tm8s
+
+Sweeps every club's spells in start-year order to find each pair of
+players who overlapped there, merges the per-club edges into the CSR
+arrays of a TeammateGraph, and writes both to one edge file that the app
+memory-maps instead of rebuilding the graph. Clubs are independent, so the
+sweeps can run on a process pool, and a rebuild only sweeps clubs whose
+rows changed since the file was written
+
+Sharded sources have no edge file; their graph is built in memory
+
+Layout (native byte order, all sections 8-byte aligned):
+    header | club names | club table | club edges (int32 a, b, years, first)
+    | offsets (int64) | neighbors | overlap_years | first_year (int32)
+
+usage: python graph_build.py --db players_database.csv --workers 4
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from connections import CancelCheck, ProgressCallback, SearchCancelled
+from instrumentation import metrics
+from paths import TeammateGraph, merge_club_edges, sweep_club
+from shards import is_sharded
+from snapshot import CsvStamp, SectionReader, add_section, format_matches, header_stamp, pad, write_replacing
+
+MAGIC = b"TM8SGRPH"
+VERSION = 2
+
+# magic, version, byte order, csv size, csv mtime_ns, csv sha256,
+# players, clubs, club names bytes, club edges, CSR slots, body crc32
+HEADER = struct.Struct("=8sIBxxxQq32sQQQQQI4x")
+
+# rows digest, first club edge, club edge count
+CLUB_ENTRY = struct.Struct("=16sQQ")
+
+# Spells per unit of work sent to the pool
+CHUNK_ROWS = 50_000
+
+# Club name -> (rows digest, flat int32 club edges)
+ClubEdges = Dict[str, Tuple[bytes, Sequence[int]]]
+
+
+def graph_path(csv_file: str) -> str:
+    """
+    Default edge file location for a CSV file
+
+    :arg csv_file: Path to the CSV file
+    """
+    return csv_file + ".tm8g"
+
+
+def club_digest(players: Sequence[str], starts: Sequence[int], ends: Sequence[int]) -> bytes:
+    """Digest of one club's spells, to tell which clubs changed between builds"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(players).encode("utf-8"))
+    digest.update(array('i', starts).tobytes())
+    digest.update(array('i', ends).tobytes())
+    return digest.digest()
+
+
+def _sweep_chunk(clubs: List[Tuple[List[str], array, array]]) -> List[array]:
+    return [sweep_club(players, starts, ends) for players, starts, ends in clubs]
+
+
+def read_club_edges(path: str) -> ClubEdges:
+    """
+    Per-club edges from an existing edge file, for an incremental rebuild
+
+    :return: Club name -> (rows digest, club edges), empty when the file is missing or unusable
+    """
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+        return {}
+
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    header = HEADER.unpack_from(data)
+    if not format_matches(header, MAGIC, VERSION) or zlib.crc32(memoryview(data)[HEADER.size:]) != header[11]:
+        return {}
+    club_count, clubs_size, club_edge_count = header[7:10]
+
+    reader = SectionReader(memoryview(data), HEADER.size)
+    try:
+        clubs = bytes(reader.take(clubs_size)).decode("utf-8").split("\0") if club_count else []
+        table_data = reader.take(club_count * CLUB_ENTRY.size)
+        edges = reader.take(16 * club_edge_count).cast('i')
+    except ValueError:
+        return {}
+
+    table = [CLUB_ENTRY.unpack_from(table_data, i * CLUB_ENTRY.size) for i in range(club_count)]
+    return {club: (digest, edges[4 * first:4 * (first + count)])
+            for club, (digest, first, count) in zip(clubs, table)}
+
+
+@metrics.timer("build_graph_file")
+def build_graph_file(db, path: Optional[str] = None, workers: int = 0,
+                     progress: Optional[ProgressCallback] = None,
+                     cancelled: Optional[CancelCheck] = None) -> TeammateGraph:
+    """
+    Build the teammate graph and write it to an edge file
+
+    Clubs whose rows match the existing file keep their edges; only the
+    others are swept, on a process pool when workers > 0
+
+    :arg db: A loaded PlayerDatabase
+    :arg path: Edge file to write, defaults to graph_path(db.csv_file)
+    :arg workers: Process pool size; 0 sweeps in this process
+    :arg progress: Called with (clubs done, total clubs)
+    :arg cancelled: Polled between clubs; raises SearchCancelled when it returns True
+    :raises ValueError: For a sharded source, or a database whose CSV failed to load
+    """
+    if is_sharded(db.csv_file):
+        raise ValueError(f"{db.csv_file} is sharded; edge files are only kept for a single CSV")
+    state = db.state
+    if state.stamp is None:
+        raise ValueError(f"{db.csv_file} was not loaded")
+
+    path = path or graph_path(db.csv_file)
+    previous = read_club_edges(path)
+
+    club_names = state.get_all_clubs()
+    club_rows: Dict[str, Tuple[List[str], Sequence[int], Sequence[int]]] = {}
+    club_edges: Dict[str, Sequence[int]] = {}
+    digests: Dict[str, bytes] = {}
+    stale: List[str] = []
+
+    for club in club_names:
+        index = state.club_index[club]
+        rows = (list(index.players), index.starts, index.ends)
+        club_rows[club] = rows
+        digests[club] = club_digest(*rows)
+        old = previous.get(club)
+        if old is not None and old[0] == digests[club]:
+            club_edges[club] = old[1]
+        else:
+            stale.append(club)
+
+    metrics.count("graph_clubs_reused", len(club_edges))
+    metrics.count("graph_clubs_swept", len(stale))
+
+    done = len(club_edges)
+    total = len(club_names)
+
+    def report() -> None:
+        if cancelled is not None and cancelled():
+            raise SearchCancelled()
+        if progress is not None:
+            progress(done, total)
+
+    if workers > 0 and len(stale) > 1:
+        chunks: List[List[str]] = [[]]
+        rows_in_chunk = 0
+        for club in stale:
+            if rows_in_chunk >= CHUNK_ROWS:
+                chunks.append([])
+                rows_in_chunk = 0
+            chunks[-1].append(club)
+            rows_in_chunk += len(club_rows[club][0])
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(chunk, pool.submit(_sweep_chunk, [
+                (club_rows[club][0], array('i', club_rows[club][1]), array('i', club_rows[club][2]))
+                for club in chunk])) for chunk in chunks]
+            try:
+                for chunk, future in futures:
+                    report()
+                    for club, edges in zip(chunk, future.result()):
+                        club_edges[club] = edges
+                    done += len(chunk)
+            except SearchCancelled:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    else:
+        for club in stale:
+            report()
+            club_edges[club] = sweep_club(*club_rows[club])
+            done += 1
+
+    names = state.get_all_players()
+    graph = merge_club_edges(names, club_rows, club_edges)
+    write_graph_file(state.stamp, path, club_names, digests, club_edges, graph)
+    return graph
+
+
+def write_graph_file(stamp: CsvStamp, path: str, club_names: List[str], digests: Dict[str, bytes],
+                     club_edges: Dict[str, Sequence[int]], graph: TeammateGraph) -> None:
+    """
+    Write the club edges and the merged graph, renaming the file into place
+
+    :arg stamp: The CSV the graph's database state was parsed from
+    :arg path: Edge file to write
+    """
+    clubs = "\0".join(club_names).encode("utf-8")
+
+    body = bytearray()
+    add_section(body, clubs)
+
+    flat_edges = array('i')
+    for club in club_names:
+        edges = club_edges[club]
+        body += CLUB_ENTRY.pack(digests[club], len(flat_edges) // 4, len(edges) // 4)
+        flat_edges.extend(edges)
+
+    for column in (flat_edges, array('q', graph.offsets), graph.neighbors, graph.overlap_years, graph.first_year):
+        add_section(body, column.tobytes())
+
+    header = HEADER.pack(*header_stamp(MAGIC, VERSION, stamp), len(graph.names), len(club_names),
+                         len(clubs), len(flat_edges) // 4, len(graph.neighbors), zlib.crc32(body))
+    write_replacing(path, header, body)
+
+
+def load_graph(db, path: Optional[str] = None) -> Optional[TeammateGraph]:
+    """
+    Memory-map the teammate graph from its edge file, if the file is current
+
+    Current means built from the same CSV bytes as the database's loaded
+    state (same size and content hash), with the same number of players
+    and an intact body. Sharded sources never have one
+
+    :arg db: A loaded PlayerDatabase
+    :arg path: Edge file to read, defaults to graph_path(db.csv_file)
+    :return: The graph over zero-copy views of the file, or None
+    """
+    if is_sharded(db.csv_file):
+        return None
+    state = db.state
+    if state.stamp is None:
+        return None
+
+    path = path or graph_path(db.csv_file)
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+        return None
+
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = HEADER.unpack_from(mapped)
+    if not format_matches(header, MAGIC, VERSION):
+        return None
+    if header[3] != state.stamp.size or header[5] != state.stamp.digest:
+        return None
+    player_count, club_count, clubs_size, club_edge_count, slot_count, crc = header[6:]
+
+    names = state.get_all_players()
+    if len(names) != player_count:
+        return None
+
+    view = memoryview(mapped)
+    if zlib.crc32(view[HEADER.size:]) != crc:
+        return None
+
+    reader = SectionReader(view, HEADER.size)
+    reader.position += clubs_size + pad(clubs_size) + club_count * CLUB_ENTRY.size + 16 * club_edge_count
+
+    try:
+        offsets = reader.take(8 * (player_count + 1)).cast('q')
+        neighbors, overlap_years, first_year = (reader.take(4 * slot_count).cast('i') for _ in range(3))
+    except ValueError:
+        return None
+
+    graph = TeammateGraph(names, offsets, neighbors, overlap_years, first_year)
+    graph.mapped = mapped
+    return graph
+
+
+def load_or_build_graph(db, path: Optional[str] = None, workers: int = 0,
+                        progress: Optional[ProgressCallback] = None,
+                        cancelled: Optional[CancelCheck] = None) -> TeammateGraph:
+    """
+    The teammate graph from its edge file, rebuilding the file when it is stale
+
+    Falls back to the in-memory graph for sharded sources and when the file cannot be written
+
+    :arg db: A loaded PlayerDatabase
+    :arg path: Edge file, defaults to graph_path(db.csv_file)
+    :arg workers: Process pool size for the club sweeps
+    :arg progress: Called with (clubs done, total clubs) while building
+    :arg cancelled: Polled between clubs; raises SearchCancelled when it returns True
+    """
+    if is_sharded(db.csv_file):
+        return TeammateGraph.from_database(db, progress, cancelled)
+
+    try:
+        graph = load_graph(db, path)
+        if graph is not None:
+            return graph
+    except Exception as e:
+        metrics.error("load_graph", e)
+
+    try:
+        return build_graph_file(db, path, workers, progress, cancelled)
+    except (OSError, ValueError) as e:
+        metrics.error("write_graph", e)
+        return TeammateGraph.from_database(db, progress, cancelled)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the Tm8s teammate edge file")
+    parser.add_argument("--db", default="players_database.csv", help="player CSV file")
+    parser.add_argument("--output", help="edge file, defaults to the CSV path plus .tm8g")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for the club sweeps (0 = none)")
+    args = parser.parse_args(argv)
+    if is_sharded(args.db):
+        parser.error("edge files are only built for a single CSV, not shards")
+
+    from compact_database import CompactPlayerDatabase
+    db = CompactPlayerDatabase(args.db)
+
+    metrics.enabled = True
+    start = time.perf_counter()
+    graph = build_graph_file(db, args.output, args.workers)
+    counters = metrics.snapshot()["counters"]
+    print(f"{args.output or graph_path(args.db)}: {len(graph)} players, {len(graph.neighbors) // 2} edges, "
+          f"{counters.get('graph_clubs_swept', 0)} clubs swept, {counters.get('graph_clubs_reused', 0)} reused "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -146,9 +146,12 @@ class Ui_TM8S(object):
         self.group_box_results = QtWidgets.QGroupBox(parent=TM8S)
         self.group_box_results.setGeometry(QtCore.QRect(9, 219, 461, 321))
         self.group_box_results.setObjectName("group_box_results")
-        self.results_display = QtWidgets.QTextEdit(parent=self.group_box_results)
+        self.results_display = QtWidgets.QListView(parent=self.group_box_results)
         self.results_display.setGeometry(QtCore.QRect(5, 21, 451, 291))
-        self.results_display.setReadOnly(True)
+        self.results_display.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.results_display.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.NoSelection)
+        self.results_display.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.results_display.setUniformItemSizes(True)
         self.results_display.setObjectName("results_display")
         self.results_box_slider = QtWidgets.QSlider(parent=self.group_box_results)
         self.results_box_slider.setGeometry(QtCore.QRect(430, 30, 22, 271))
@@ -171,11 +174,6 @@ class Ui_TM8S(object):
         self.player_search_button.setText(_translate("TM8S", "Search"))
         self.reset_button.setText(_translate("TM8S", "Reset"))
         self.group_box_results.setTitle(_translate("TM8S", "Results"))
-        self.results_display.setHtml(_translate("TM8S", "<!DOCTYPE HTML PUBLIC \"-//W3C//DTD HTML 4.0//EN\" \"http://www.w3.org/TR/REC-html40/strict.dtd\">\n"
-"<html><head><meta name=\"qrichtext\" content=\"1\" /><style type=\"text/css\">\n"
-"p, li { white-space: pre-wrap; }\n"
-"</style></head><body style=\" font-family:\'MS Shell Dlg 2\'; font-size:7.8pt; font-weight:400; font-style:normal;\">\n"
-"<p style=\"-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><br /></p></body></html>"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+"""
+Timing and profiling instrumentation for Tm8s
+
+A process-wide Metrics registry of latency histograms and counters. The
+database, search and connection code report into it through timer(),
+timed() and count(); each of those checks one flag first, so with
+instrumentation disabled (the default) the hooks cost an attribute lookup.
+
+Enable with TM8S_METRICS=1 or metrics.enabled = True, read it back with
+metrics.snapshot() or metrics.dump(path)
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# Bucket i holds durations up to 2**i microseconds; the last one is open-ended
+BUCKETS = 27
+
+
+class Histogram:
+    """Latency histogram with power-of-two microsecond buckets"""
+    def __init__(self) -> None:
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+
+    def observe(self, seconds: float) -> None:
+        micros = int(seconds * 1_000_000)
+        self.counts[min(BUCKETS - 1, micros.bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Upper bound of the bucket holding a percentile, in seconds
+
+        :arg fraction: 0.5 for the median, 0.99 for p99
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, (1 << bucket) / 1_000_000)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "min_ms": round(self.min * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p90_ms": round(self.percentile(0.9) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets_us": {str(1 << bucket): count for bucket, count in enumerate(self.counts) if count}
+        }
+
+
+class Metrics:
+    """
+    Per-operation latency histograms and counters
+
+    Thread-safe, since searches run on worker threads and the query server
+    answers from a pool
+    """
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one duration for an operation"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Add to a counter, when enabled"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def error(self, name: str, error: Exception) -> None:
+        """Print an error as before and count it under errors.<name>"""
+        print(f"Error: {str(error)}")
+        self.count(f"errors.{name}")
+
+
+    def timed(self, name: str):
+        """
+        Context manager timing a block into the named histogram
+
+        :arg name: Operation name
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timer(self, name: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator timing every call of a function into the named histogram
+
+        Whether to time is decided per call, so enabling metrics later still works
+
+        :arg name: Operation name
+        """
+        def decorate(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current histograms and counters as plain, JSON-ready data"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "timings": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items()))
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def dump(self, path: str) -> None:
+        """Write the snapshot to a JSON file"""
+        with open(path, 'w') as file:
+            file.write(self.to_json())
+
+    def reset(self) -> None:
+        """Drop every histogram and counter"""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def report(self) -> str:
+        """Short human-readable summary, one line per operation and counter"""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        for name, timing in snapshot["timings"].items():
+            lines.append(f"{name}: {timing['count']} calls, mean {timing['mean_ms']:.2f} ms, "
+                         f"p99 {timing['p99_ms']:.2f} ms, max {timing['max_ms']:.2f} ms")
+        counters = snapshot["counters"]
+        for name, value in counters.items():
+            lines.append(f"{name}: {value:,}")
+            if name.endswith(".hits"):
+                cache = name[:-len(".hits")]
+                misses = counters.get(f"{cache}.misses", 0)
+                lines.append(f"{cache}.hit_rate: {value / (value + misses):.1%}")
+        return "\n".join(lines) if lines else "No measurements yet"
+
+
+def profile(function: Callable, *args, sort: str = "cumulative", limit: int = 25,
+            **kwargs) -> Tuple[Any, str]:
+    """
+    Run a single call under cProfile
+
+    Independent of Metrics.enabled, so one slow query can be examined
+    without turning instrumentation on for everything
+
+    :arg function: What to profile, e.g. db.search_players
+    :arg sort: pstats sort key
+    :arg limit: Number of functions in the report
+    :return: (the call's result, the pstats report)
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args, **kwargs)
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return result, out.getvalue()
+
+
+metrics = Metrics(enabled=os.environ.get("TM8S_METRICS", "") not in ("", "0"))
@@ -1,8 +1,18 @@
+import heapq
 import sys
+import threading
 from PyQt6 import QtWidgets, QtCore, QtGui
 from gui import *
 from database import *
+from compact_database import *
 from connections import *
+from paths import *
+from models import *
+from workers import *
+from cache import *
+from instrumentation import metrics, profile
+from stats_panel import StatsPanel
+from graph_build import load_graph, load_or_build_graph
 
 
 class TM8SApp(QtWidgets.QDialog):
@@ -18,35 +28,100 @@ class TM8SApp(QtWidgets.QDialog):
         self.ui = Ui_TM8S()
         self.ui.setupUi(self)
 
-        self.db = PlayerDatabase()
+        # Cheap enough to leave on in the app, and the stats panel needs it
+        metrics.enabled = True
+        self.db = CompactPlayerDatabase()
 
         print(f"Database loaded. Players: {len(self.db.players_db)}")
-        for player in self.db.players_db:
-            print(f"  - {player}")
 
-        self.connection_finder = ConnectionFinder()
+        self.connection_finder = CachedConnectionFinder(self.db)
+        self.path_finder: Optional[PathFinder] = None
+        self.path_finder_lock = threading.Lock()
+        try:
+            # Memory-mapping a current edge file is cheap; otherwise the graph is built on first use
+            graph = load_graph(self.db)
+            if graph is not None:
+                self.path_finder = PathFinder(graph)
+        except Exception as e:
+            metrics.error("load_graph", e)
+
+        self.thread_pool = QtCore.QThreadPool.globalInstance()
+        self.search_worker: Optional[SearchWorker] = None
+
+        # Player 1's teammates are prefetched while the user is still choosing player 2,
+        # on a pool of its own so the lowered thread priority never carries over to searches
+        self.prefetch_pool = QtCore.QThreadPool(self)
+        self.prefetch_pool.setMaxThreadCount(1)
+        self.prefetch_pool.setThreadPriority(QtCore.QThread.Priority.LowestPriority)
+        self.prefetch_worker: Optional[SearchWorker] = None
+        self.prefetch_key: Optional[Tuple[str, int]] = None
+
+        self.search_model = PlayerSearchModel(self.db, parent=self)
+        self.completion_box: Optional[QtWidgets.QComboBox] = None
+        self.completion_timer = QtCore.QTimer(self)
+        self.completion_timer.setSingleShot(True)
+        self.completion_timer.setInterval(150)
+
+        self.results_model = ResultsModel(self)
+        self.results_delegate = ResultsDelegate(self)
+
+        # Teammate mode ranks the list into a heap once and pops it a page at a time
+        self.teammate_player: Optional[str] = None
+        self.teammate_heap: List[Tuple[int, int, Teammate]] = []
+        self.teammates_shown = 0
+        self.teammate_page_size = 50
+
+        # Edits to the CSV are picked up once they settle, without a restart
+        self.reload_worker: Optional[SearchWorker] = None
+        self.reload_timer = QtCore.QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(500)
+        self.csv_watcher = QtCore.QFileSystemWatcher([self.db.csv_file], self)
+
+        self.stats_panel = StatsPanel(metrics, self)
+        self.stats_button = QtWidgets.QPushButton("Stats", parent=self.ui.group_box_player_search)
+        self.stats_button.setGeometry(QtCore.QRect(390, 170, 50, 24))
 
         self.initialize_ui()
 
         self.ui.p1_search_box.lineEdit().textChanged.connect(self.update_button_state)
         self.ui.p2_search_box.lineEdit().textChanged.connect(self.update_button_state)
+        self.ui.p1_search_box.lineEdit().textChanged.connect(self.cancel_search)
+        self.ui.p2_search_box.lineEdit().textChanged.connect(self.cancel_search)
+        self.ui.p1_search_box.lineEdit().textChanged.connect(
+            lambda: self.schedule_completions(self.ui.p1_search_box))
+        self.ui.p2_search_box.lineEdit().textChanged.connect(
+            lambda: self.schedule_completions(self.ui.p2_search_box))
+        self.completion_timer.timeout.connect(self.refresh_completions)
         self.ui.player_search_button.clicked.connect(self.search_connection)
         self.ui.results_box_slider.valueChanged.connect(self.adjust_results_scroll)
+        self.ui.results_display.verticalScrollBar().rangeChanged.connect(self.update_results_slider_range)
+        self.ui.results_display.verticalScrollBar().valueChanged.connect(self.update_results_slider_value)
         self.ui.reset_button.clicked.connect(self.reset_form)
+        self.stats_button.clicked.connect(self.stats_panel.show)
+        self.csv_watcher.fileChanged.connect(lambda path: self.reload_timer.start())
+        self.reload_timer.timeout.connect(self.reload_database)
 
 
     def initialize_ui(self) -> None:
         """
         Initialize UI elements with default values and player data
 
-        Set up placeholders, clearing input fields, and initializing progress bar
+        Set up placeholders, clearing input fields, and initializing progress bar.
+        Both search boxes complete from the shared search model rather than
+        holding every player name, and the results list draws from the results model
         """
         self.ui.p1_search_box.lineEdit().setPlaceholderText("Begin typing a player name")
         self.ui.p2_search_box.lineEdit().setPlaceholderText("Begin typing a player name")
 
-        all_players = self.db.get_all_players()
-        self.ui.p1_search_box.addItems(all_players)
-        self.ui.p2_search_box.addItems(all_players)
+        for search_box in (self.ui.p1_search_box, self.ui.p2_search_box):
+            completer = QtWidgets.QCompleter(self.search_model, self)
+            completer.setCompletionMode(QtWidgets.QCompleter.CompletionMode.UnfilteredPopupCompletion)
+            search_box.setCompleter(completer)
+
+        self.ui.results_display.setModel(self.results_model)
+        self.ui.results_display.setItemDelegate(self.results_delegate)
+        self.ui.results_box_slider.setRange(0, 0)
 
         self.ui.p1_search_box.clearEditText()
         self.ui.p2_search_box.clearEditText()
@@ -57,21 +132,101 @@ class TM8SApp(QtWidgets.QDialog):
         self.setWindowTitle("Tm8s")
 
 
+    def schedule_completions(self, search_box: QtWidgets.QComboBox) -> None:
+        """
+        Debounce typing before querying the search index
+
+        :arg search_box: The search box being typed in
+        """
+        self.completion_box = search_box
+        self.completion_timer.start()
+
+
+    def refresh_completions(self) -> None:
+        """Fill the search model for the last edited box and show its popup"""
+        search_box = self.completion_box
+        if search_box is None:
+            return
+
+        text = search_box.currentText()
+        completer = search_box.completer()
+        if text in self.db.players_db:
+            completer.popup().hide()
+            return
+
+        self.search_model.set_query(text)
+        if self.search_model.rowCount() > 0:
+            completer.complete()
+        else:
+            completer.popup().hide()
+
+
     def update_button_state(self) -> None:
         """
         Enable/disable search button via input validation
 
         Button is enabled when both player search bars contain
-        player names validated against database
+        player names validated against database, or when player 1 is
+        valid and player 2 is empty, which lists player 1's teammates.
+        A valid player 1 also starts prefetching their teammates
         """
         p1_text = self.ui.p1_search_box.currentText()
         p2_text = self.ui.p2_search_box.currentText()
 
         p1_valid = bool(p1_text) and (p1_text in self.db.players_db)
         p2_valid = bool(p2_text) and (p2_text in self.db.players_db)
+        teammate_mode = p1_valid and not p2_text.strip()
+
+        self.ui.player_search_button.setText("Find teammates" if teammate_mode else "Search")
+        self.ui.player_search_button.setEnabled((p1_valid and p2_valid) or teammate_mode)
+        self.prefetch_teammates(p1_text if p1_valid else None)
 
-        button_enabled = p1_valid and p2_valid
-        self.ui.player_search_button.setEnabled(p1_valid and p2_valid)
+
+    def prefetch_teammates(self, player: Optional[str]) -> None:
+        """
+        Compute player 1's teammates on the low-priority prefetch pool before Search is pressed
+
+        The connection finder keeps them in its teammate cache, so the search
+        that follows only looks player 2 up in them. Changing the selection
+        cancels a prefetch still running for the previous player
+
+        :arg player: The validated player 1, or None when there is none
+        """
+        key = None if player is None else (player, self.db.generation)
+        if key == self.prefetch_key:
+            return
+
+        if self.prefetch_worker is not None:
+            self.prefetch_worker.cancel()
+            self.prefetch_worker = None
+            metrics.count("teammate_cache.prefetches_cancelled")
+
+        self.prefetch_key = key
+        if player is None:
+            return
+
+        worker = SearchWorker(
+            lambda progress, cancelled: self.connection_finder.prefetch_teammates(player, cancelled))
+        worker.signals.finished.connect(lambda result: self.end_prefetch(worker))
+        worker.signals.cancelled.connect(lambda: self.end_prefetch(worker))
+        worker.signals.failed.connect(lambda message: self.end_prefetch(worker, message))
+
+        self.prefetch_worker = worker
+        self.prefetch_pool.start(worker)
+
+
+    def end_prefetch(self, worker: SearchWorker, error: Optional[str] = None) -> None:
+        """
+        Forget a prefetch once it is over
+
+        :arg worker: The worker that ended; ignored if it has been superseded
+        :arg error: Failure message, if it failed
+        """
+        if error is not None:
+            print(f"Error: {error}")
+            metrics.count("errors.prefetch")
+        if worker is self.prefetch_worker:
+            self.prefetch_worker = None
 
 
     def search_connection(self) -> None:
@@ -82,160 +237,368 @@ class TM8SApp(QtWidgets.QDialog):
         p1 = self.ui.p1_search_box.currentText()
         p2 = self.ui.p2_search_box.currentText()
 
+        self.cancel_search()
         self.ui.search_progress_bar.setVisible(True)
         self.ui.player_search_button.setEnabled(False)
 
-        self.start_search_process(p1, p2)
+        if p2.strip():
+            self.start_search_process(p1, p2)
+        else:
+            self.start_teammate_search(p1)
 
 
     def start_search_process(self, p1: str, p2: str) -> None:
         """
-        Start search process with progress animation
+        Start the search on a worker thread
+
+        The progress bar follows the engine's own progress reports and the
+        result comes back to display_connection_results through signals
 
         :arg p1: First player name
         :arg p2: Second player name
         """
-        self.progress_counter = 0
+        self.run_search(lambda progress, cancelled: self.find_connections(p1, p2, progress, cancelled),
+                        lambda worker, result: self.finish_search(worker, p1, p2, result))
+
+
+    def start_teammate_search(self, player: str) -> None:
+        """
+        List everyone a player overlapped with on a worker thread
+
+        :arg player: The player's name
+        """
+        def task(progress, cancelled):
+            teammates = self.connection_finder.teammates_of(player, cancelled)
+            progress(100)
+            return teammates
+
+        self.run_search(task, lambda worker, teammates: self.finish_teammate_search(worker, player, teammates))
+
+
+    def run_search(self, task: SearchTask, finished: Callable[[SearchWorker, Any], None]) -> None:
+        """
+        Run a search task on the thread pool, replacing any running search
+
+        Runs the task under cProfile when the stats panel asked for it
+
+        :arg task: The search, called with (progress, cancelled) on the worker thread
+        :arg finished: Called with (worker, result) on the GUI thread
+        """
+        self.cancel_search()
+
+        if self.stats_panel.take_profile_request():
+            search = task
 
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(lambda: self.update_search_progress(p1, p2))
-        self.timer.start(50)
+            def task(progress, cancelled):
+                result, report = profile(search, progress, cancelled)
+                self.stats_panel.profile_ready.emit(report)
+                return result
 
+        worker = SearchWorker(task)
+        worker.signals.progress.connect(lambda value: self.update_search_progress(worker, value))
+        worker.signals.finished.connect(lambda result: finished(worker, result))
+        worker.signals.cancelled.connect(lambda: self.end_search(worker))
+        worker.signals.failed.connect(lambda message: self.fail_search(worker, message))
 
-    def update_search_progress(self, p1: str, p2: str) -> None:
-        """Update progress bar when searching"""
-        self.progress_counter += 2
-        self.ui.search_progress_bar.setValue(self.progress_counter)
+        self.search_worker = worker
+        self.ui.search_progress_bar.setValue(0)
+        self.thread_pool.start(worker)
+
+
+    def update_search_progress(self, worker: SearchWorker, value: int) -> None:
+        """Update progress bar when searching, ignoring superseded searches"""
+        if worker is self.search_worker:
+            self.ui.search_progress_bar.setValue(value)
+
+
+    def cancel_search(self) -> None:
+        """Cancel the running search, if any, and hide its progress"""
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.end_search(self.search_worker)
+
+
+    def end_search(self, worker: SearchWorker) -> None:
+        """
+        Restore the search controls once a search is over
 
-        if self.progress_counter >= 100:
-            self.timer.stop()
-            self.ui.search_progress_bar.setVisible(False)
-            self.ui.player_search_button.setEnabled(True)
+        :arg worker: The worker that ended; ignored if it has been superseded
+        """
+        if worker is not self.search_worker:
+            return
 
-            self.find_display_connections(p1, p2)
+        self.search_worker = None
+        self.ui.search_progress_bar.setVisible(False)
+        self.update_button_state()
 
 
-    def find_display_connections(self, p1: str, p2: str):
-        """Find connections between players, display result
+    def finish_search(self, worker: SearchWorker, p1: str, p2: str,
+                      result: Tuple[List[Dict[str, Any]], Optional[List[str]]]) -> None:
+        """
+        Display a finished search's results
 
+        :arg worker: The worker that produced the result
         :arg p1: First player name
         :arg p2: Second player name
+        :arg result: (connections, chain) from find_connections
         """
-        try:
-            p1_clubs = self.db.get_player_data(p1)
-            p2_clubs = self.db.get_player_data(p2)
+        if worker is not self.search_worker:
+            return
+
+        self.end_search(worker)
+        connections, chain = result
+        self.display_connection_results(p1, p2, connections, chain)
 
-            connections = self.connection_finder.find_player_connections(p1_clubs, p2_clubs)
 
-            self.display_connection_results(p1, p2, connections)
+    def finish_teammate_search(self, worker: SearchWorker, player: str,
+                               teammates: Dict[str, List[Connection]]) -> None:
+        """
+        Display a finished teammate search's first page
+
+        :arg worker: The worker that produced the result
+        :arg player: The player whose teammates were listed
+        :arg teammates: Teammate name -> connections from teammates_of
+        """
+        if worker is not self.search_worker:
+            return
+
+        self.end_search(worker)
+        self.display_teammate_results(player, teammates)
+
+
+    def reload_database(self) -> None:
+        """Apply changes to the CSV on a worker thread; searches keep running on the old data"""
+        if self.reload_worker is not None:
+            self.reload_timer.start()
+            return
+
+        worker = SearchWorker(lambda progress, cancelled: self.db.reload())
+        worker.signals.finished.connect(self.finish_reload)
+        worker.signals.failed.connect(lambda message: self.finish_reload(False))
+        self.reload_worker = worker
+        self.thread_pool.start(worker)
+
+
+    def finish_reload(self, changed: bool) -> None:
+        """
+        Refresh what depends on the data after a reload
+
+        The connection cache notices the new generation by itself, the
+        teammate graph is rebuilt on next use, and the completer re-runs
+        its current query against the name index the reload worker built
+
+        :arg changed: Whether the reload found changes
+        """
+        self.reload_worker = None
+
+        # Editors that save by renaming drop the file from the watcher
+        if self.db.csv_file not in self.csv_watcher.files():
+            self.csv_watcher.addPath(self.db.csv_file)
+
+        if not changed:
+            return
+
+        with self.path_finder_lock:
+            self.path_finder = None
+
+        self.search_model.set_query(self.search_model.query)
+        self.update_button_state()
+        print(f"Database reloaded. Players: {len(self.db.players_db)}")
+
+
+    def fail_search(self, worker: SearchWorker, message: str) -> None:
+        """Report a search error"""
+        print(f"Error: {message}")
+        metrics.count("errors.search")
+        self.end_search(worker)
+
+
+    def find_connections(self, p1: str, p2: str, progress: Optional[Callable[[int], None]] = None,
+                         cancelled: Optional[CancelCheck] = None
+                         ) -> Tuple[List[Dict[str, Any]], Optional[List[str]]]:
+        """
+        Find direct connections, falling back to a teammate chain
+
+        Safe to call from a worker thread
+
+        :arg p1: First player name
+        :arg p2: Second player name
+        :arg progress: Called with overall progress as a percentage
+        :arg cancelled: Polled by the engines; they raise SearchCancelled when it returns True
+        """
+        report = progress or (lambda percent: None)
+
+        records = self.connection_finder.connections_between(
+            p1, p2, progress=lambda done, total: report(10 * done // total), cancelled=cancelled)
+        connections = [record.as_dict() for record in records]
+
+        chain = None
+        if not connections:
+            chain = self.find_teammate_chain(p1, p2, report, cancelled)
+
+        return connections, chain
+
+
+    def find_teammate_chain(self, p1: str, p2: str, progress: Optional[Callable[[int], None]] = None,
+                            cancelled: Optional[CancelCheck] = None) -> Optional[List[str]]:
+        """
+        Find the shortest chain of teammates linking two players
+
+        Without a current edge file the teammate graph is built (and saved)
+        on first use, which takes up most of the progress range; the BFS
+        itself reports 80-100%
+
+        :arg p1: First player name
+        :arg p2: Second player name
+        :arg progress: Called with overall progress as a percentage
+        :arg cancelled: Polled by the engines; they raise SearchCancelled when it returns True
+        """
+        report = progress or (lambda percent: None)
+        if not self.db.connected(p1, p2):
+            # Different components: no chain exists, so skip building the graph and searching it
+            return None
+
+        with self.path_finder_lock:
+            if self.path_finder is None:
+                graph = load_or_build_graph(
+                    self.db, progress=lambda done, total: report(10 + 70 * done // total),
+                    cancelled=cancelled)
+                self.path_finder = PathFinder(graph)
+            # A reload may drop self.path_finder once the lock is released
+            path_finder = self.path_finder
+
+        return path_finder.find_path(
+            p1, p2, tie_break="longest", progress=lambda done, total: report(80 + 20 * done // total),
+            cancelled=cancelled)
+
+
+    def describe_chain_link(self, a: str, b: str) -> str:
+        """
+        Describe one hop of a teammate chain
+
+        :arg a: Player at the start of the hop
+        :arg b: Player at the end of the hop
+        """
+        try:
+            connections = self.connection_finder.find_connections(
+                self.db.get_player_data(a), self.db.get_player_data(b))
+            conn = connections[0]
+            return f"{conn.club_name} ({conn.overlap_start}-{conn.overlap_end})"
         except Exception as e:
             print(f"Error: {str(e)}")
+            return ""
 
 
-    def display_connection_results(self, p1: str, p2: str, connections: List[Dict[str, Any]]) -> None:
+    def display_connection_results(self, p1: str, p2: str, connections: List[Dict[str, Any]],
+                                   chain: Optional[List[str]] = None) -> None:
         """
         Display formatted connection results
 
         :arg p1: First player name
         :arg p2: Second player name
         :arg connections: list of connection dictionaries found between players
+        :arg chain: shortest teammate chain from p1 to p2, used when they never played together
         """
+        self.teammate_player = None
+        rows = [(f"{p1} and {p2}", "title"), ("", "normal")]
+
+        if connections:
+            rows += [("✓ PLAYED TOGETHER AT:", "success"), ("", "normal")]
 
-        bold_format = QtGui.QTextCharFormat()
-        bold_format.setFontWeight(QtGui.QFont.Weight.Bold)
+            for conn in connections:
+                rows += [
+                    (f"{conn['club_name']}", "heading"),
+                    (f"Played together: {conn['overlap_start']}-{conn['overlap_end']}", "success"),
+                    (f"{p1} at club: {conn['p1_period']}", "normal"),
+                    (f"{p2} at club: {conn['p2_period']}", "normal"),
+                    ("", "normal")
+                ]
+        else:
+            rows.append(("✗ Never played together at the same club", "failure"))
 
-        normal_format = QtGui.QTextCharFormat()
-        normal_format.setFontWeight(QtGui.QFont.Weight.Normal)
+            if chain:
+                rows += [("", "normal"), (f"↔ CONNECTED IN {len(chain) - 1} STEPS:", "success"), ("", "normal")]
 
-        green_format = QtGui.QTextCharFormat()
-        green_format.setForeground(QtGui.QBrush(QtGui.QColor("green")))
-        green_format.setFontWeight(QtGui.QFont.Weight.Bold)
+                for a, b in zip(chain, chain[1:]):
+                    rows += [
+                        (f"{a} → {b}", "heading"),
+                        (self.describe_chain_link(a, b), "normal"),
+                        ("", "normal")
+                    ]
 
-        red_format = QtGui.QTextCharFormat()
-        red_format.setForeground(QtGui.QBrush(QtGui.QColor("red")))
-        red_format.setFontWeight(QtGui.QFont.Weight.Bold)
+        self.results_model.set_rows(rows)
 
-        blue_format = QtGui.QTextCharFormat()
-        blue_format.setForeground(QtGui.QBrush(QtGui.QColor("blue")))
-        blue_format.setFontWeight(QtGui.QFont.Weight.Bold)
 
-        self.ui.results_display.clear()
-        cursor = self.ui.results_display.textCursor()
+    def display_teammate_results(self, player: str, teammates: Dict[str, List[Connection]]) -> None:
+        """
+        Display a player's teammates ranked by shared years
 
-        cursor.insertText(f"{p1} and {p2}", bold_format)
-        cursor.insertBlock()
-        cursor.insertBlock()
+        The teammates are heapified once and only the first page is popped;
+        the results view asks for the next one when it is scrolled to the end
 
-        overlapping = [c for c in connections if c.get("overlapped", False)]
+        :arg player: The player whose teammates were listed
+        :arg teammates: Teammate name -> connections from find_teammates
+        """
+        self.teammate_player = player
+        self.teammate_heap = self.connection_finder.ranking_heap(teammates)
+        self.teammates_shown = 0
 
-        if connections:
-            cursor.insertText("✓ PLAYED TOGETHER AT:", green_format)
-            cursor.insertBlock()
-            cursor.insertBlock()
+        header = [(f"{player}: {len(teammates)} teammates, by years together", "title"), ("", "normal")]
+        self.results_model.set_rows(header + self.next_teammate_page(), fetch=self.next_teammate_page)
 
-            for conn in connections:
-                cursor.insertText(f"{conn['club_name']}", blue_format)
-                cursor.insertBlock()
 
-                cursor.insertText(f"Played together: {conn['overlap_start']}-{conn['overlap_end']}", green_format)
-                cursor.insertBlock()
+    def next_teammate_page(self) -> List[ResultRow]:
+        """Rows for the next page of ranked teammates, empty once all are shown"""
+        heap = self.teammate_heap
+        page = [heapq.heappop(heap)[2] for _ in range(min(self.teammate_page_size, len(heap)))]
 
-                cursor.insertText(f"{p1} at club: {conn['p1_period']}", normal_format)
-                cursor.insertBlock()
-                cursor.insertText(f"{p2} at club: {conn['p2_period']}", normal_format)
-                cursor.insertBlock()
-                cursor.insertBlock()
-        else:
-            cursor.insertText("✗ Never played together at the same club", red_format)
+        rows = []
+        for rank, teammate in enumerate(page, self.teammates_shown + 1):
+            clubs = ", ".join(f"{c.club_name} {c.overlap_start}-{c.overlap_end}" for c in teammate.connections)
+            rows += [(f"{rank}. {teammate.name} ({teammate.shared_years} years)", "heading"), (clubs, "normal")]
 
-        self.update_results_slider_range()
+        self.teammates_shown += len(page)
+        return rows
 
 
     def adjust_results_scroll(self, value: int) -> None:
         """
-        Adjust scrollbar of the results text
+        Scroll the results list to the slider's position
 
-        :arg value: Slider value (0-100)
+        :arg value: Slider value, in the list scrollbar's own units
         """
+        self.ui.results_display.verticalScrollBar().setValue(value)
 
-        scrollbar = self.ui.results_display.verticalScrollBar()
-        if scrollbar.maximum() > 0:
-            position = int(value * scrollbar.maximum() / 100)
-            scrollbar.setValue(position)
 
+    def update_results_slider_range(self, minimum: int, maximum: int) -> None:
+        """Keep the slider's range equal to the results list scrollbar's"""
+        self.ui.results_box_slider.setRange(minimum, maximum)
 
-    def update_results_slider_range(self) -> None:
-        """Update the slider range based on content height"""
-        try:
-            scrollbar = self.ui.results_display.verticalScrollBar()
-            if scrollbar.maximum() > 0:
-                self.ui.results_box_slider.setMaximum(100)
-                self.ui.results_box_slider.setValue(0)
-            else:
-                self.ui.results_box_slider.setMaximum(0)
-        except Exception as e:
-            print(f"Error: {str(e)}")
+
+    def update_results_slider_value(self, value: int) -> None:
+        """Follow wheel and keyboard scrolling of the results list on the slider"""
+        self.ui.results_box_slider.blockSignals(True)
+        self.ui.results_box_slider.setValue(value)
+        self.ui.results_box_slider.blockSignals(False)
 
 
     def reset_form(self) -> None:
         """Reset the form"""
 
-        self.ui.results_display.clear()
+        self.cancel_search()
+        self.teammate_player = None
+        self.teammate_heap = []
+        self.results_model.clear()
 
         self.ui.search_progress_bar.setValue(0)
         self.ui.search_progress_bar.setVisible(False)
 
         self.ui.player_search_button.setEnabled(False)
 
-        all_players = self.db.get_all_players()
-
-        self.ui.p1_search_box.clear()
-        self.ui.p2_search_box.clear()
-        self.ui.p1_search_box.addItems(all_players)
-        self.ui.p2_search_box.addItems(all_players)
-
         self.ui.p1_search_box.clearEditText()
         self.ui.p2_search_box.clearEditText()
+        self.completion_timer.stop()
+        self.search_model.set_query("")
 
         self.ui.p1_search_box.lineEdit().setPlaceholderText("Begin typing a player name")
         self.ui.p2_search_box.lineEdit().setPlaceholderText("Begin typing a player name")
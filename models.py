@@ -0,0 +1,197 @@
+"""
+Qt item models and delegates for Tm8s
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+# One results line: (text, style), style being a key of ResultsDelegate.STYLES
+ResultRow = Tuple[str, str]
+
+
+class PlayerSearchModel(QtCore.QAbstractListModel):
+    """
+    Player name completion model for Tm8s
+
+    Holds only the current query's matches, fetched from the database's
+    search index a batch at a time as the completer popup scrolls
+    """
+    def __init__(self, db, batch_size: int = 25, parent: QtCore.QObject = None) -> None:
+        """
+        :arg db: A loaded PlayerDatabase
+        :arg batch_size: Rows fetched per query and per fetchMore
+        """
+        super().__init__(parent)
+        self.db = db
+        self.batch_size = batch_size
+        self.query = ""
+        self.players: List[str] = []
+        self.exhausted = True
+
+
+    def set_query(self, query: str) -> None:
+        """
+        Replace the rows with the first batch of matches for a query
+
+        :arg query: Partial player name
+        """
+        self.beginResetModel()
+        self.query = query.strip()
+        self.players = self.db.search_players(self.query, self.batch_size) if self.query else []
+        self.exhausted = len(self.players) < self.batch_size
+        self.endResetModel()
+
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.players)
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= len(self.players):
+            return None
+        if role in (QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.EditRole):
+            return self.players[index.row()]
+        return None
+
+    def canFetchMore(self, parent: QtCore.QModelIndex) -> bool:
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent: QtCore.QModelIndex) -> None:
+        """Append the next batch; search results are stable so earlier rows are a prefix"""
+        if parent.isValid() or self.exhausted:
+            return
+
+        wanted = len(self.players) + self.batch_size
+        more = self.db.search_players(self.query, wanted)[len(self.players):]
+        self.exhausted = len(self.players) + len(more) < wanted
+
+        if more:
+            first = len(self.players)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(more) - 1)
+            self.players.extend(more)
+            self.endInsertRows()
+
+
+class ResultsModel(QtCore.QAbstractListModel):
+    """
+    Results pane model for Tm8s
+
+    One row per displayed line. Rows can be appended while a result streams
+    in, and a fetch callback can supply further pages on demand, which the
+    view asks for when it is scrolled to the end
+    """
+    StyleRole = QtCore.Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent: QtCore.QObject = None) -> None:
+        super().__init__(parent)
+        self.rows: List[ResultRow] = []
+        self.fetch: Optional[Callable[[], List[ResultRow]]] = None
+
+
+    def set_rows(self, rows: List[ResultRow], fetch: Optional[Callable[[], List[ResultRow]]] = None) -> None:
+        """
+        Replace every row
+
+        :arg rows: Lines to show
+        :arg fetch: Returns the next page of lines, or an empty list when there are no more
+        """
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.fetch = fetch
+        self.endResetModel()
+
+    def append(self, rows: List[ResultRow]) -> None:
+        """Add lines at the end without touching the existing ones"""
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self) -> None:
+        self.set_rows([])
+
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        text, style = self.rows[index.row()]
+        if role in (QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.ToolTipRole):
+            return text
+        if role == self.StyleRole:
+            return style
+        return None
+
+    def canFetchMore(self, parent: QtCore.QModelIndex) -> bool:
+        return not parent.isValid() and self.fetch is not None
+
+    def fetchMore(self, parent: QtCore.QModelIndex) -> None:
+        if parent.isValid() or self.fetch is None:
+            return
+        rows = self.fetch()
+        if not rows:
+            self.fetch = None
+        self.append(rows)
+
+
+class ResultsDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    Paints ResultsModel rows as single styled lines
+
+    Fonts and pens are built once per style, and every row has the same
+    height, so the view only lays out and paints the rows on screen
+    """
+    STYLES: Dict[str, Tuple[bool, Optional[str]]] = {
+        "normal": (False, None),
+        "title": (True, None),
+        "success": (True, "green"),
+        "failure": (True, "red"),
+        "heading": (True, "blue"),
+    }
+
+    def __init__(self, parent: QtCore.QObject = None) -> None:
+        super().__init__(parent)
+        self.fonts: Dict[str, QtGui.QFont] = {}
+        self.pens: Dict[str, QtGui.QPen] = {}
+        self.row_height = 0
+
+
+    def formats_for(self, base: QtGui.QFont, palette: QtGui.QPalette) -> None:
+        """Build the cached fonts and pens from the view's font and palette"""
+        for style, (bold, color) in self.STYLES.items():
+            font = QtGui.QFont(base)
+            font.setBold(bold)
+            self.fonts[style] = font
+            self.pens[style] = QtGui.QPen(QtGui.QColor(color) if color else
+                                          palette.color(QtGui.QPalette.ColorRole.Text))
+        self.row_height = QtGui.QFontMetrics(self.fonts["title"]).height() + 2
+
+    def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionViewItem,
+              index: QtCore.QModelIndex) -> None:
+        if not self.fonts:
+            self.formats_for(option.font, option.palette)
+
+        style = index.data(ResultsModel.StyleRole) or "normal"
+        font = self.fonts.get(style, self.fonts["normal"])
+        rect = option.rect.adjusted(4, 0, -4, 0)
+        text = QtGui.QFontMetrics(font).elidedText(index.data() or "", QtCore.Qt.TextElideMode.ElideRight,
+                                                   rect.width())
+
+        painter.save()
+        painter.setFont(font)
+        painter.setPen(self.pens.get(style, self.pens["normal"]))
+        painter.drawText(rect, QtCore.Qt.AlignmentFlag.AlignVCenter | QtCore.Qt.AlignmentFlag.AlignLeft, text)
+        painter.restore()
+
+    def sizeHint(self, option: QtWidgets.QStyleOptionViewItem, index: QtCore.QModelIndex) -> QtCore.QSize:
+        if not self.fonts:
+            self.formats_for(option.font, option.palette)
+        return QtCore.QSize(option.rect.width(), self.row_height)
@@ -0,0 +1,336 @@
+"""
+Degrees of separation search for Tm8s
+"""
+
+import heapq
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from connections import CancelCheck, ProgressCallback, SearchCancelled
+from instrumentation import metrics
+
+
+def sweep_club(players: Sequence[str], starts: Sequence[int], ends: Sequence[int]) -> array:
+    """
+    Teammate edges of one club
+
+    Spells must be sorted by start year. A heap of still-active spells
+    yields every overlapping pair exactly once. Players are numbered by
+    their position in sorted(set(players)), so the result only depends on
+    the club's own rows
+
+    :return: Flat int32 (low id, high id, overlap years, first year) rows, sorted
+    """
+    local_names = sorted(set(players))
+    local_ids = {name: i for i, name in enumerate(local_names)}
+
+    edges: Dict[Tuple[int, int], List[int]] = {}
+    active: List[Tuple[int, int]] = []
+    for player, start_year, end_year in zip(players, starts, ends):
+        while active and active[0][0] <= start_year:
+            heapq.heappop(active)
+
+        if start_year >= end_year:
+            continue
+
+        player_id = local_ids[player]
+        for other_end, other_id in active:
+            if other_id == player_id:
+                continue
+            years = min(end_year, other_end) - start_year
+            key = (player_id, other_id) if player_id < other_id else (other_id, player_id)
+            edge = edges.get(key)
+            if edge is None:
+                edges[key] = [years, start_year]
+            else:
+                edge[0] += years
+                edge[1] = min(edge[1], start_year)
+
+        heapq.heappush(active, (end_year, player_id))
+
+    flat = array('i')
+    for (a, b), (years, first) in sorted(edges.items()):
+        flat.extend((a, b, years, first))
+    return flat
+
+
+def merge_club_edges(names: List[str], club_rows: Dict[str, Tuple[List[str], Sequence[int], Sequence[int]]],
+                     club_edges: Dict[str, Sequence[int]]) -> "TeammateGraph":
+    """
+    Sum per-club edges into one graph over global player IDs
+
+    Edges are added in (low, high) order, so every adjacency list comes out sorted.
+    Local IDs follow name order like global ones, so each local low < high
+    stays low < high, and a pair is keyed by the single int low * len(names) + high
+    """
+    ids = {name: i for i, name in enumerate(names)}
+    count = len(names)
+    edges: Dict[int, List[int]] = {}
+
+    for club, flat in club_edges.items():
+        local = [ids[name] for name in sorted(set(club_rows[club][0]))]
+        for i in range(0, len(flat), 4):
+            key = local[flat[i]] * count + local[flat[i + 1]]
+            edge = edges.get(key)
+            if edge is None:
+                edges[key] = [flat[i + 2], flat[i + 3]]
+            else:
+                edge[0] += flat[i + 2]
+                edge[1] = min(edge[1], flat[i + 3])
+
+    return TeammateGraph.from_edges(names, {divmod(key, count): edges[key] for key in sorted(edges)})
+
+
+class TeammateGraph:
+    """
+    Compact teammate graph for Tm8s
+
+    Players are integer IDs (their position in the sorted player list) and
+    adjacency is stored in CSR form: the neighbours of player i are
+    neighbors[offsets[i]:offsets[i + 1]], with the matching overlap_years and
+    first_year (earliest overlap start) held in parallel arrays
+    """
+    def __init__(self, names: List[str], offsets: array, neighbors: array,
+                 overlap_years: array, first_year: array) -> None:
+        """
+        Wrap prebuilt CSR arrays
+
+        :arg names: Player names indexed by ID
+        :arg offsets: Start of each player's adjacency, len(names) + 1 entries
+        :arg neighbors: Neighbour IDs
+        :arg overlap_years: Total years shared with each neighbour
+        :arg first_year: Earliest year shared with each neighbour
+        """
+        self.names = names
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.overlap_years = overlap_years
+        self.first_year = first_year
+
+
+    @classmethod
+    @metrics.timer("build_teammate_graph")
+    def from_database(cls, db, progress: Optional[ProgressCallback] = None,
+                      cancelled: Optional[CancelCheck] = None) -> "TeammateGraph":
+        """
+        Derive the teammate graph from a PlayerDatabase's club index
+
+        Each club is swept on its own by sweep_club and the per-club edges
+        are summed by merge_club_edges, as the offline build does
+
+        :arg db: A loaded PlayerDatabase
+        :arg progress: Called with (clubs done, total clubs)
+        :arg cancelled: Polled once per club; raises SearchCancelled when it returns True
+        """
+        state = db.state
+        club_rows: Dict[str, Tuple[List[str], Sequence[int], Sequence[int]]] = {}
+        club_edges: Dict[str, Sequence[int]] = {}
+
+        club_count = len(state.club_index)
+        for done, (club, index) in enumerate(state.club_index.items()):
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            if progress is not None:
+                progress(done, club_count)
+
+            rows = club_rows[club] = (list(index.players), index.starts, index.ends)
+            club_edges[club] = sweep_club(*rows)
+
+        return merge_club_edges(state.get_all_players(), club_rows, club_edges)
+
+
+    @classmethod
+    def from_edges(cls, names: List[str], edges: Dict[Tuple[int, int], List[int]]) -> "TeammateGraph":
+        """
+        Build CSR arrays from an undirected edge map
+
+        :arg names: Player names indexed by ID
+        :arg edges: (low_id, high_id) -> [overlap_years, first_year]
+        """
+        count = len(names)
+        degree = array('l', [0]) * (count + 1)
+        for a, b in edges:
+            degree[a + 1] += 1
+            degree[b + 1] += 1
+
+        offsets = array('l', [0]) * (count + 1)
+        for i in range(count):
+            offsets[i + 1] = offsets[i] + degree[i + 1]
+
+        total = offsets[count]
+        neighbors = array('i', [0]) * total
+        overlap_years = array('i', [0]) * total
+        first_year = array('i', [0]) * total
+        cursor = array('l', offsets[:count])
+
+        for (a, b), (years, first) in edges.items():
+            for src, dst in ((a, b), (b, a)):
+                slot = cursor[src]
+                neighbors[slot] = dst
+                overlap_years[slot] = years
+                first_year[slot] = first
+                cursor[src] = slot + 1
+
+        return cls(names, offsets, neighbors, overlap_years, first_year)
+
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def degree(self, player_id: int) -> int:
+        """Number of distinct teammates of a player"""
+        return self.offsets[player_id + 1] - self.offsets[player_id]
+
+    def edge_slot(self, a: int, b: int) -> int:
+        """
+        Find the CSR slot of edge a -> b, or -1 when they never played together
+
+        :arg a: Source player ID
+        :arg b: Target player ID
+        """
+        for slot in range(self.offsets[a], self.offsets[a + 1]):
+            if self.neighbors[slot] == b:
+                return slot
+        return -1
+
+
+class PathFinder:
+    """
+    Finds the shortest teammate chain between two players
+
+    Runs a bidirectional BFS over a TeammateGraph, always expanding the
+    smaller frontier. Among equally short chains an optional tie-break
+    prefers the earliest or the longest shared spells. Given the players'
+    components, players in different components are answered without searching
+    """
+    TIE_BREAKS = (None, "earliest", "longest")
+
+    def __init__(self, graph: TeammateGraph, components=None) -> None:
+        """
+        :arg graph: The teammate graph to search
+        :arg components: Optional Components of the same database
+        """
+        self.graph = graph
+        self.components = components
+
+
+    @metrics.timer("find_path")
+    def find_path(self, p1: str, p2: str, max_depth: int = 6, tie_break: Optional[str] = None,
+                  progress: Optional[ProgressCallback] = None,
+                  cancelled: Optional[CancelCheck] = None) -> Optional[List[str]]:
+        """
+        Find the shortest chain of teammates linking two players
+
+        :arg p1: First player name
+        :arg p2: Second player name
+        :arg max_depth: Longest chain to consider, in hops
+        :arg tie_break: None, "earliest" or "longest"
+        :arg progress: Called with (levels searched, max_depth)
+        :arg cancelled: Polled once per BFS level; raises SearchCancelled when it returns True
+        :return: Player names from p1 to p2, or None when no chain within max_depth
+        """
+        if tie_break not in self.TIE_BREAKS:
+            raise ValueError(f"Unknown tie-break: {tie_break}")
+
+        graph = self.graph
+        if p1 not in graph.ids or p2 not in graph.ids:
+            return None
+
+        source = graph.ids[p1]
+        target = graph.ids[p2]
+        if source == target:
+            return [p1]
+        if self.components is not None and not self.components.connected(p1, p2):
+            metrics.count("paths_disconnected")
+            return None
+
+        forward: Dict[int, int] = {source: -1}
+        backward: Dict[int, int] = {target: -1}
+        forward_frontier = [source]
+        backward_frontier = [target]
+        depth = 0
+
+        while forward_frontier and backward_frontier and depth < max_depth:
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            if progress is not None:
+                progress(depth, max_depth)
+
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meets = self._expand(forward_frontier, forward, backward, tie_break)
+            else:
+                backward_frontier, meets = self._expand(backward_frontier, backward, forward, tie_break)
+            depth += 1
+
+            if meets:
+                paths = [self._join(meet, forward, backward) for meet in meets]
+                if tie_break is not None:
+                    paths.sort(key=lambda path: self._path_score(path, tie_break))
+                return [graph.names[i] for i in paths[0]]
+
+        return None
+
+
+    def _expand(self, frontier: List[int], parents: Dict[int, int],
+                other: Dict[int, int], tie_break: Optional[str]) -> Tuple[List[int], List[int]]:
+        """
+        Expand one BFS level
+
+        :return: The next frontier and any nodes already reached from the other side
+        """
+        graph = self.graph
+        offsets = graph.offsets
+        neighbors = graph.neighbors
+        found: Dict[int, Tuple[int, int]] = {}
+
+        for node in frontier:
+            for slot in range(offsets[node], offsets[node + 1]):
+                neighbor = neighbors[slot]
+                if neighbor in parents:
+                    continue
+                best = found.get(neighbor)
+                if best is None or (tie_break is not None and
+                                    self._edge_score(slot, tie_break) < self._edge_score(best[0], tie_break)):
+                    found[neighbor] = (slot, node)
+
+        next_frontier = []
+        meets = []
+        for neighbor, (_, node) in found.items():
+            parents[neighbor] = node
+            next_frontier.append(neighbor)
+            if neighbor in other:
+                meets.append(neighbor)
+
+        return next_frontier, meets
+
+
+    def _edge_score(self, slot: int, tie_break: str) -> int:
+        """Sort key for one edge, lower is better"""
+        if tie_break == "earliest":
+            return self.graph.first_year[slot]
+        return -self.graph.overlap_years[slot]
+
+    def _path_score(self, path: List[int], tie_break: str) -> int:
+        """Sort key for a whole chain, lower is better"""
+        score = 0
+        for a, b in zip(path, path[1:]):
+            score += self._edge_score(self.graph.edge_slot(a, b), tie_break)
+        return score
+
+    @staticmethod
+    def _join(meet: int, forward: Dict[int, int], backward: Dict[int, int]) -> List[int]:
+        """Stitch the two half-paths together at the meeting node"""
+        path = []
+        node = meet
+        while node != -1:
+            path.append(node)
+            node = forward[node]
+        path.reverse()
+
+        node = backward[meet]
+        while node != -1:
+            path.append(node)
+            node = backward[node]
+
+        return path
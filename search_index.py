@@ -0,0 +1,190 @@
+"""
+Player name search index for Tm8s
+"""
+
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Sequence
+
+
+def normalize_name(name: str) -> str:
+    """
+    Fold a name for matching: strip accents, case-fold and collapse whitespace
+
+    :arg name: Raw player name or query
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def trigrams(text: str) -> List[str]:
+    """
+    Distinct trigrams of a string, in order of first appearance
+
+    :arg text: Normalized text
+    """
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+
+class _KeyView(Sequence):
+    """Sorted view of prefix entries, truncated to a fixed length for bisecting"""
+    def __init__(self, index: "NameIndex", ids: array, offsets: array, length: int) -> None:
+        self.normalized = index.normalized
+        self.ids = ids
+        self.offsets = offsets
+        self.length = length
+
+    def __getitem__(self, i: int) -> str:
+        start = self.offsets[i]
+        return self.normalized[self.ids[i]][start:start + self.length]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class NameIndex:
+    """
+    Search index over player names
+
+    Built once from the full name list. Names are accent-folded, then indexed
+    two ways: sorted prefix arrays (whole name and each later word) answer
+    prefix queries by binary search, and trigram posting lists answer infix
+    and typo-tolerant queries. Results are ranked by tier: name prefix,
+    word prefix, infix, then fuzzy. Within the first three tiers names come
+    in alphabetical order
+    """
+    FUZZY_CANDIDATES = 1000
+
+    def __init__(self, names: List[str]) -> None:
+        """
+        Build the index
+
+        :arg names: Player names; results are returned as these strings
+        """
+        self.names = names
+        self.normalized = [normalize_name(name) for name in names]
+
+        self.name_ids = array('i', sorted(range(len(names)), key=self.normalized.__getitem__))
+        self.name_offsets = array('i', [0]) * len(names)
+
+        word_starts = [(name_id, i + 1) for name_id, text in enumerate(self.normalized)
+                       for i, char in enumerate(text) if char == " "]
+        word_starts.sort(key=lambda entry: self.normalized[entry[0]][entry[1]:])
+        self.word_ids = array('i', [name_id for name_id, _ in word_starts])
+        self.word_offsets = array('i', [offset for _, offset in word_starts])
+
+        postings: Dict[str, List[int]] = {}
+        for name_id, text in enumerate(self.normalized):
+            for gram in trigrams(f" {text} "):
+                postings.setdefault(gram, []).append(name_id)
+        self.postings: Dict[str, array] = {gram: array('i', ids) for gram, ids in postings.items()}
+
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Find names matching a query, best matches first
+
+        Queries shorter than three characters only match prefixes. Fuzzy
+        matches are only tried when nothing matched exactly. An empty query
+        matches every name, in sorted order
+
+        :arg query: Partial name, any case or accents
+        :arg limit: Maximum number of results, None for all; 0 or less returns nothing
+        """
+        if limit is not None and limit <= 0:
+            return []
+
+        text = normalize_name(query)
+        if not text:
+            return self._names(self.name_ids[:limit])
+
+        results: List[int] = []
+        seen = set()
+
+        def add(name_ids) -> bool:
+            """Append unseen IDs, returning True once limit is reached"""
+            for name_id in name_ids:
+                if name_id not in seen:
+                    seen.add(name_id)
+                    results.append(name_id)
+                    if limit is not None and len(results) >= limit:
+                        return True
+            return False
+
+        if add(self._prefix_range(self.name_ids, self.name_offsets, text)):
+            return self._names(results)
+        if add(self._prefix_range(self.word_ids, self.word_offsets, text)):
+            return self._names(results)
+
+        if len(text) >= 3:
+            if add(self._infix(text, seen)):
+                return self._names(results)
+
+            if not results:
+                add(self._fuzzy(text, seen))
+
+        return self._names(results)
+
+
+    def _names(self, name_ids: List[int]) -> List[str]:
+        return [self.names[name_id] for name_id in name_ids]
+
+    def _prefix_range(self, ids: array, offsets: array, text: str):
+        """IDs whose entry starts with text, in sorted order"""
+        keys = _KeyView(self, ids, offsets, len(text))
+        low = bisect_left(keys, text)
+        high = bisect_right(keys, text, lo=low)
+        return (ids[i] for i in range(low, high))
+
+    def _infix(self, text: str, exclude: set) -> Iterator[int]:
+        """
+        IDs whose name contains text
+
+        Only the rarest trigram's posting list is walked; each candidate is
+        confirmed with a substring check, so results stream out and the caller
+        can stop as soon as it has enough
+        """
+        lists = [self.postings.get(gram, ()) for gram in trigrams(text)]
+        rarest = min(lists, key=len, default=())
+        normalized = self.normalized
+        return (name_id for name_id in rarest
+                if name_id not in exclude and text in normalized[name_id])
+
+    def _fuzzy(self, text: str, exclude: set) -> List[int]:
+        """
+        IDs sharing at least half of the query's trigrams, most shared first
+
+        A name sharing threshold of n trigrams must contain one of the
+        n - threshold + 1 rarest, so candidates come from those posting lists
+        only, rarest first, capped at FUZZY_CANDIDATES to bound the latency
+        """
+        grams = trigrams(f" {text} ")
+        threshold = max(2, (len(grams) + 1) // 2)
+        rarest = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+
+        candidates = set()
+        for gram in rarest[:len(grams) - threshold + 1]:
+            for name_id in self.postings.get(gram, ()):
+                if name_id not in exclude:
+                    candidates.add(name_id)
+                    if len(candidates) >= self.FUZZY_CANDIDATES:
+                        break
+            else:
+                continue
+            break
+
+        matches = []
+        for name_id in candidates:
+            name = f" {self.normalized[name_id]} "
+            shared = sum(1 for gram in grams if gram in name)
+            if shared >= threshold:
+                matches.append((-shared, len(name), name_id))
+
+        matches.sort()
+        return [name_id for _, _, name_id in matches]
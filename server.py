@@ -0,0 +1,290 @@
+"""
+Local query server for Tm8s
+
+Serves lookups over HTTP/JSON from one warm process, so tools do not each
+have to load players_database.csv. Binds to localhost only by default
+
+    GET /search?q=messi&limit=10
+    GET /connections?p1=Lionel+Messi&p2=Luis+Suarez
+    GET /teammates?player=Lionel+Messi
+    GET /teammates?player=Lionel+Messi&top=10
+    GET /connected?p1=Lionel+Messi&p2=Luis+Suarez
+    GET /graph?top=10&samples=64
+    GET /stats
+
+usage: python server.py [--db players_database.csv] [--port 8765] [--threads 4]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from cache import CachedConnectionFinder
+from compact_database import CompactPlayerDatabase
+from components import graph_stats
+from graph_build import load_graph
+from instrumentation import metrics
+from paths import TeammateGraph
+from shards import ShardedPlayerDatabase, is_sharded
+
+
+class QueryError(Exception):
+    """A request that cannot be answered, with the HTTP status to send"""
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class QueryServer:
+    """
+    Asyncio HTTP/JSON server over one PlayerDatabase and ConnectionFinder
+
+    Identical requests that arrive while one is already running share its
+    result instead of being computed again. Connection and teammate lookups
+    run on a thread pool so the event loop keeps accepting requests; the
+    lookups are pure Python, so the GIL still runs them one at a time and
+    the pool buys responsiveness, not parallelism. They share the warm
+    database and caches, which a process pool could not
+    """
+    def __init__(self, db, threads: int = 4) -> None:
+        """
+        :arg db: A loaded PlayerDatabase
+        :arg threads: Size of the pool that keeps heavy queries off the event loop
+        """
+        self.db = db
+        self.finder = CachedConnectionFinder(db)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="tm8s-query")
+        self.inflight: Dict[Tuple, asyncio.Future] = {}
+        self.graph: Optional[Tuple[int, TeammateGraph]] = None
+        self.graph_lock = threading.Lock()
+
+        self.requests = 0
+        self.coalesced = 0
+
+        self.routes: Dict[str, Tuple[Callable[[Dict[str, str]], Any], bool]] = {
+            "/search": (self.search, False),
+            "/connections": (self.connections, True),
+            "/teammates": (self.teammates, True),
+            "/connected": (self.connected, True),
+            "/graph": (self.graph_summary, True),
+            "/stats": (self.stats, False),
+        }
+
+
+    def search(self, params: Dict[str, str]) -> Dict[str, Any]:
+        query = self._param(params, "q")
+        limit = int(params.get("limit", 20))
+        return {"query": query, "players": self.db.search_players(query, limit)}
+
+    def connections(self, params: Dict[str, str]) -> Dict[str, Any]:
+        p1 = self._player(params, "p1")
+        p2 = self._player(params, "p2")
+        records = self.finder.connections_between(p1, p2)
+        return {"p1": p1, "p2": p2, "connections": [record._asdict() for record in records]}
+
+    def teammates(self, params: Dict[str, str]) -> Dict[str, Any]:
+        player = self._player(params, "player")
+        teammates = self.finder.teammates_of(player)
+        if "top" in params:
+            ranked = self.finder.rank_teammates(teammates, int(params["top"]))
+            return {"player": player, "top": [
+                {"name": teammate.name, "shared_years": teammate.shared_years,
+                 "connections": [connection._asdict() for connection in teammate.connections]}
+                for teammate in ranked
+            ]}
+        return {"player": player, "teammates": {
+            name: [connection._asdict() for connection in connections]
+            for name, connections in sorted(teammates.items())
+        }}
+
+    def connected(self, params: Dict[str, str]) -> Dict[str, Any]:
+        p1 = self._player(params, "p1")
+        p2 = self._player(params, "p2")
+        return {"p1": p1, "p2": p2, "connected": self.db.connected(p1, p2),
+                "component_size": self.db.components.component_size(p1)}
+
+    def graph_summary(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return graph_stats(self.db.components, self.teammate_graph(),
+                           int(params.get("top", 10)), int(params.get("samples", 64)))
+
+    def teammate_graph(self) -> TeammateGraph:
+        """The teammate graph of the current generation, from the edge file when it is current"""
+        # Pool threads wait for one build instead of each building the graph
+        with self.graph_lock:
+            generation = self.db.generation
+            if self.graph is None or self.graph[0] != generation:
+                self.graph = (generation, load_graph(self.db) or TeammateGraph.from_database(self.db))
+            return self.graph[1]
+
+    def stats(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {"requests": self.requests, "coalesced": self.coalesced,
+                "inflight": len(self.inflight), "pair_cache": self.finder.cache.stats(),
+                "teammate_cache": self.finder.teammate_cache.stats(),
+                "metrics": metrics.snapshot()}
+
+
+    def _param(self, params: Dict[str, str], name: str) -> str:
+        value = params.get(name, "").strip()
+        if not value:
+            raise QueryError(HTTPStatus.BAD_REQUEST, f"missing parameter: {name}")
+        return value
+
+    def _player(self, params: Dict[str, str], name: str) -> str:
+        player = self._param(params, name)
+        if player not in self.db.players_db:
+            raise QueryError(HTTPStatus.NOT_FOUND, f"unknown player: {player}")
+        return player
+
+
+    async def dispatch(self, target: str) -> Any:
+        """
+        Answer one request target, merging it with an identical in-flight request
+
+        :arg target: Request path and query string
+        """
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            raise QueryError(HTTPStatus.NOT_FOUND, f"unknown endpoint: {url.path}")
+
+        handler, heavy = route
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/stats":
+            return handler(params)
+
+        key = (url.path, tuple(sorted(params.items())))
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        if heavy:
+            future = loop.run_in_executor(self.executor, handler, params)
+        else:
+            future = loop.create_future()
+            try:
+                future.set_result(handler(params))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self.inflight.pop(key, None)
+
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length: Optional[int] = int(headers.get("content-length", 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    length = None
+                if length:
+                    await reader.readexactly(length)
+
+                parts = request_line.decode("latin-1").split()
+                keep_alive = headers.get("connection", "").lower() != "close" and parts[-1:] != ["HTTP/1.0"]
+                self.requests += 1
+
+                if length is None:
+                    # Where the body ends is unknown, so the connection cannot be reused
+                    status, body = HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"}
+                    keep_alive = False
+                elif len(parts) != 3:
+                    status, body = HTTPStatus.BAD_REQUEST, {"error": "malformed request"}
+                elif parts[0] != "GET":
+                    status, body = HTTPStatus.METHOD_NOT_ALLOWED, {"error": "only GET is supported"}
+                else:
+                    try:
+                        status, body = HTTPStatus.OK, await self.dispatch(parts[1])
+                    except QueryError as e:
+                        status, body = e.status, {"error": str(e)}
+                    except ValueError as e:
+                        status, body = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+                    except Exception as e:
+                        print(f"Error: {str(e)}")
+                        status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1"))
+                writer.write(payload)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765,
+                    ready: Optional[Callable[[int], None]] = None) -> None:
+        """
+        Serve until cancelled
+
+        :arg host: Interface to bind, localhost by default
+        :arg port: TCP port, 0 picks a free one
+        :arg ready: Called with the bound port once listening
+        """
+        server = await asyncio.start_server(self.handle_client, host, port)
+        bound_port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready(bound_port)
+        else:
+            print(f"Tm8s server on http://{host}:{bound_port} ({len(self.db.players_db)} players)")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve Tm8s lookups over local HTTP/JSON")
+    parser.add_argument("--db", default="players_database.csv", help="player CSV file, or a directory or glob of CSV shards")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--threads", type=int, default=4,
+                        help="threads that keep heavy queries off the event loop (they still share the GIL)")
+    args = parser.parse_args(argv)
+
+    db_class = ShardedPlayerDatabase if is_sharded(args.db) else CompactPlayerDatabase
+    server = QueryServer(db_class(args.db), args.threads)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
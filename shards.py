@@ -0,0 +1,189 @@
+"""
+Sharded CSV ingestion for Tm8s
+
+Loads a directory or glob of CSVs (one per league or season, say) into one
+columnar store. Shards are parsed and sorted concurrently on a process pool;
+the sorted shards are then merged in one pass, which also merges duplicate
+and overlapping spells of the same player at the same club
+"""
+
+import csv
+import glob
+import heapq
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from compact_database import CompactPlayerDatabase
+from database import CsvRow, DatabaseState
+from instrumentation import metrics
+
+# Player names, club names, then player id, club id, start and end columns
+# sorted by (player, club, start, end)
+ParsedShard = Tuple[List[str], List[str], array, array, array, array]
+
+
+def is_sharded(source: str) -> bool:
+    """Whether a path names several CSVs: a directory or a glob pattern"""
+    return os.path.isdir(source) or any(char in source for char in "*?[")
+
+
+def shard_files(source: str) -> List[str]:
+    """
+    The CSV files a source names, in a stable order
+
+    :arg source: A directory of .csv files, a glob pattern, or a single CSV
+    """
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.csv")))
+    if is_sharded(source):
+        return sorted(path for path in glob.glob(source) if os.path.isfile(path))
+    return [source]
+
+
+def parse_shard(path: str) -> ParsedShard:
+    """
+    Parse one shard into interned columns sorted by (player, club, start, end)
+
+    Runs in a pool worker, so the sort happens in parallel too
+
+    :arg path: Path of the shard CSV
+    """
+    names: List[str] = []
+    name_ids: Dict[str, int] = {}
+    clubs: List[str] = []
+    club_ids: Dict[str, int] = {}
+    rows: List[Tuple[int, int, int, int]] = []
+
+    with open(path, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            player_name = row['Player Name']
+            club = row['Club']
+
+            player_id = name_ids.get(player_name)
+            if player_id is None:
+                player_id = name_ids[player_name] = len(names)
+                names.append(player_name)
+
+            club_id = club_ids.get(club)
+            if club_id is None:
+                club_id = club_ids[club] = len(clubs)
+                clubs.append(club)
+
+            rows.append((player_id, club_id, int(row['Start Year']), int(row['End Year'])))
+
+    rows.sort(key=lambda spell: (names[spell[0]], clubs[spell[1]], spell[2], spell[3]))
+    return (names, clubs, array('i', [spell[0] for spell in rows]), array('i', [spell[1] for spell in rows]),
+            array('i', [spell[2] for spell in rows]), array('i', [spell[3] for spell in rows]))
+
+
+def _shard_rows(shard: ParsedShard) -> Iterator[CsvRow]:
+    names, clubs, players, club_column, starts, ends = shard
+    for player_id, club_id, start_year, end_year in zip(players, club_column, starts, ends):
+        yield names[player_id], clubs[club_id], start_year, end_year
+
+
+def merge_shards(shards: List[ParsedShard]) -> Iterator[CsvRow]:
+    """
+    Merge sorted shards into one stream of deduplicated spells
+
+    A k-way merge brings every spell of a player at a club together in
+    start order, so spells that repeat or overlap (or meet end to start,
+    as consecutive season files do) fold into one in a single pass. Each
+    player's merged spells come out in start-year order
+
+    :arg shards: Parsed shards from parse_shard
+    """
+    merged = 0
+    player: Optional[str] = None
+    career: List[Tuple[int, int, str]] = []
+    current: Optional[List] = None
+
+    def flush() -> Iterator[CsvRow]:
+        career.sort()
+        for start_year, end_year, club in career:
+            yield player, club, start_year, end_year
+        career.clear()
+
+    for player_name, club, start_year, end_year in heapq.merge(*map(_shard_rows, shards)):
+        if current is not None and current[0] == player_name and current[1] == club \
+                and start_year <= current[3]:
+            current[3] = max(current[3], end_year)
+            merged += 1
+            continue
+
+        if current is not None:
+            career.append((current[2], current[3], current[1]))
+        if player_name != player:
+            yield from flush()
+            player = player_name
+        current = [player_name, club, start_year, end_year]
+
+    if current is not None:
+        career.append((current[2], current[3], current[1]))
+    yield from flush()
+    metrics.count("spells_merged", merged)
+
+
+class ShardedPlayerDatabase(CompactPlayerDatabase):
+    """
+    Compact Player Database loaded from several CSV shards
+
+    Shards are parsed on a process pool and merged into one columnar store,
+    with duplicate and overlapping spells merged. Reload re-reads the shards
+    when any of them changed, was added or was removed.
+    No binary snapshot is kept for sharded sources.
+    Exposes the same API as PlayerDatabase
+    """
+    def __init__(self, source: str, workers: Optional[int] = None, index_names: bool = True) -> None:
+        """
+        Initialize the sharded player database
+
+        :param source: A directory of .csv files or a glob pattern such as "data/*.csv"
+        :param workers: Parser processes, defaults to one per CPU; 0 parses in this process
+        :param index_names: Build the name search index with each load, on the loading thread
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        super().__init__(source, use_snapshot=False, index_names=index_names)
+
+
+    def read_rows(self, offset: int = 0) -> Tuple[Iterator[CsvRow], Dict[str, Tuple[int, int]]]:
+        """
+        Merged, deduplicated rows of every shard
+
+        The shards are stamped before they are parsed, so a shard that
+        changes meanwhile is picked up again by the next reload
+
+        :arg offset: Unused; shards are always read whole
+        :return: The rows, and each shard's size and mtime by path
+        """
+        stamp = self.shard_stats()
+        paths = list(stamp)
+        if self.workers > 0 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(paths))) as pool:
+                shards = list(pool.map(parse_shard, paths))
+        else:
+            shards = [parse_shard(path) for path in paths]
+
+        metrics.count("shards_parsed", len(shards))
+        return merge_shards(shards), stamp
+
+
+    def shard_stats(self) -> Dict[str, Tuple[int, int]]:
+        """Size and mtime of each shard, by path"""
+        state = {}
+        for path in shard_files(self.csv_file):
+            stat = os.stat(path)
+            state[path] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    def csv_change(self, state: DatabaseState) -> Optional[str]:
+        """
+        "rewrite" when any shard changed, appeared or disappeared since a state was parsed, else None
+
+        Appends are not tracked per shard, since merging can fold a new row into an existing spell
+
+        :arg state: The loaded state, stamped with the shard stats it was parsed from
+        """
+        return None if self.shard_stats() == state.stamp else "rewrite"
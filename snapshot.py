@@ -0,0 +1,249 @@
+"""
+Binary snapshot cache for Tm8s
+
+A snapshot is a versioned dump of a CompactPlayerDatabase's columns, tied to
+the CSV it was built from by size, mtime and SHA-256. Loading one memory-maps
+the file and hands the int32 columns to the database as zero-copy views.
+The header stamp, section layout and atomic write helpers here are shared
+with the teammate edge file written by graph_build
+
+Layout (native byte order, all sections 8-byte aligned):
+    header | player names | club names | offsets (int64) | club_offsets (int64)
+    | player_column | club_column | start_column | end_column | club_order (int32)
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import zlib
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b"TM8SSNAP"
+VERSION = 1
+
+# magic, version, byte order, csv size, csv mtime_ns, csv sha256 (the stamp),
+# players, clubs, rows, names bytes, clubs bytes, body crc32
+HEADER = struct.Struct("=8sIBxxxQq32sQQQQQI4x")
+
+
+class CsvStamp(NamedTuple):
+    """Size, mtime and SHA-256 of the CSV bytes some data was parsed from"""
+    size: int
+    mtime_ns: int
+    digest: bytes
+
+
+def snapshot_path(csv_file: str) -> str:
+    """
+    Default snapshot location for a CSV file
+
+    :arg csv_file: Path to the CSV file
+    """
+    return csv_file + ".tm8s"
+
+
+def file_digest(path: str, size: Optional[int] = None) -> bytes:
+    """
+    SHA-256 of a file's contents
+
+    :arg path: Path to the file
+    :arg size: Only hash the first size bytes, None for the whole file
+    """
+    return file_hash(path, size).digest()
+
+
+def file_hash(path: str, size: Optional[int] = None):
+    """
+    Running SHA-256 of a file's contents, for hashing more bytes after them
+
+    :arg path: Path to the file
+    :arg size: Only hash the first size bytes, None for the whole file
+    """
+    digest = hashlib.sha256()
+    remaining = size
+    with open(path, 'rb') as file:
+        while remaining is None or remaining > 0:
+            chunk = file.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest
+
+
+def pad(length: int) -> int:
+    """Bytes needed to round length up to a multiple of 8"""
+    return -length % 8
+
+
+def add_section(body: bytearray, data: bytes) -> None:
+    """Append a section to a file body, padded to 8-byte alignment"""
+    body += data
+    body += bytes(pad(len(data)))
+
+
+def header_stamp(magic: bytes, version: int, stamp: CsvStamp) -> Tuple[bytes, int, bool, int, int, bytes]:
+    """
+    The leading header fields of a cache file built from a CSV
+
+    :arg magic: The file format's magic bytes
+    :arg version: The file format's version
+    :arg stamp: The CSV bytes the cached data was parsed from, not the file as it is now
+    :return: (magic, version, byte order, csv size, csv mtime_ns, csv sha256)
+    """
+    return (magic, version, sys.byteorder == "little", stamp.size, stamp.mtime_ns, stamp.digest)
+
+
+def format_matches(stamp: Sequence, magic: bytes, version: int) -> bool:
+    """
+    Whether a cache file's header stamp has this format's magic, version and byte order
+
+    :arg stamp: The first six header fields, as built by header_stamp
+    :arg magic: The expected magic bytes
+    :arg version: The expected version
+    """
+    return stamp[0] == magic and stamp[1] == version and stamp[2] == (sys.byteorder == "little")
+
+
+def stamp_is_current(stamp: Sequence, magic: bytes, version: int, csv_file: str) -> bool:
+    """
+    Whether a cache file's header stamp matches this format and the CSV
+
+    A wrong format rejects the file, as does a CSV whose size differs,
+    or whose mtime differs and whose content hash does too
+
+    :arg stamp: The first six header fields, as built by header_stamp
+    :arg magic: The expected magic bytes
+    :arg version: The expected version
+    :arg csv_file: The CSV the file should have been built from
+    """
+    if not format_matches(stamp, magic, version):
+        return False
+
+    csv_size, csv_mtime, csv_hash = stamp[3:6]
+    stat = os.stat(csv_file)
+    if stat.st_size != csv_size:
+        return False
+    return stat.st_mtime_ns == csv_mtime or file_digest(csv_file) == csv_hash
+
+
+def write_replacing(path: str, header: bytes, body: bytes) -> None:
+    """
+    Write a file next to its final location and rename it into place,
+    so a crash never leaves a half-written file behind
+
+    :arg path: The file to write
+    :arg header: Packed header
+    :arg body: Everything after the header
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(header)
+        file.write(body)
+    os.replace(temp_path, path)
+
+
+class SectionReader:
+    """Reads consecutive 8-byte-aligned sections of a mapped file"""
+    def __init__(self, view: memoryview, position: int) -> None:
+        """
+        :arg view: The whole file
+        :arg position: Offset of the first section
+        """
+        self.view = view
+        self.position = position
+
+    def take(self, size: int) -> memoryview:
+        """
+        The next section of size bytes
+
+        :raises ValueError: When the file ends before the section does
+        """
+        section = self.view[self.position:self.position + size]
+        if len(section) != size:
+            raise ValueError("File is truncated")
+        self.position += size + pad(size)
+        return section
+
+
+def write_snapshot(db, path: Optional[str] = None) -> None:
+    """
+    Write a CompactPlayerDatabase to a snapshot file, renaming it into place
+
+    :arg db: A loaded CompactPlayerDatabase; the file is stamped with the CSV its state was parsed from
+    :arg path: Where to write the snapshot, defaults to snapshot_path(db.csv_file)
+    """
+    path = path or snapshot_path(db.csv_file)
+    store = db.state
+
+    names = "\0".join(store.player_names).encode("utf-8")
+    clubs = "\0".join(store.club_names).encode("utf-8")
+
+    body = bytearray()
+    for blob in (names, clubs):
+        add_section(body, blob)
+    for column in (store.offsets, store.club_offsets, store.player_column, store.club_column,
+                   store.start_column, store.end_column, store.club_order):
+        add_section(body, column.tobytes())
+
+    header = HEADER.pack(*header_stamp(MAGIC, VERSION, store.stamp), len(store.player_names),
+                         len(store.club_names), len(store.player_column), len(names), len(clubs),
+                         zlib.crc32(body))
+    write_replacing(path, header, body)
+
+
+def load_snapshot(db, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Read a CompactPlayerDatabase's columns from its snapshot, if the snapshot is current
+
+    The snapshot is rejected when the CSV size differs, or when its mtime
+    differs and its content hash does too. A wrong magic, version, byte order
+    or body checksum also rejects it
+
+    :arg db: A CompactPlayerDatabase
+    :arg path: Snapshot to read, defaults to snapshot_path(db.csv_file)
+    :return: ColumnStore arguments viewing the mapped file, stamped with the CSV it was built from, or None
+    """
+    path = path or snapshot_path(db.csv_file)
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+        return None
+
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = HEADER.unpack_from(mapped)
+    if not stamp_is_current(header, MAGIC, VERSION, db.csv_file):
+        return None
+    player_count, club_count, row_count, names_size, clubs_size, crc = header[6:]
+
+    view = memoryview(mapped)
+    if zlib.crc32(view[HEADER.size:]) != crc:
+        return None
+
+    reader = SectionReader(view, HEADER.size)
+    try:
+        names = bytes(reader.take(names_size)).decode("utf-8")
+        clubs = bytes(reader.take(clubs_size)).decode("utf-8")
+        offsets = reader.take(8 * (player_count + 1)).cast('q')
+        club_offsets = reader.take(8 * (club_count + 1)).cast('q')
+        columns = [reader.take(4 * row_count).cast('i') for _ in range(5)]
+    except ValueError:
+        return None
+
+    player_column, club_column, start_column, end_column, club_order = columns
+    return {
+        "player_names": names.split("\0") if player_count else [],
+        "club_names": clubs.split("\0") if club_count else [],
+        "offsets": offsets,
+        "player_column": player_column,
+        "club_column": club_column,
+        "start_column": start_column,
+        "end_column": end_column,
+        "club_order": club_order,
+        "club_offsets": club_offsets,
+        "snapshot_mmap": mapped,
+        "stamp": CsvStamp(*header[3:6])
+    }
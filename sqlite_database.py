@@ -0,0 +1,355 @@
+"""
+SQLite-backed player database for Tm8s, for datasets larger than RAM
+"""
+
+import os
+import sqlite3
+import threading
+from array import array
+from collections.abc import Mapping
+from typing import Iterator, List, Optional, Tuple
+
+from connections import Connection
+from database import ClubIndex, CsvRow, DatabaseState, PlayerDatabase
+from instrumentation import metrics
+from search_index import normalize_name
+from snapshot import CsvStamp, file_digest
+
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE spells (
+    player TEXT NOT NULL,
+    club TEXT NOT NULL,
+    start_year INTEGER NOT NULL,
+    end_year INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE player_names USING fts5(name, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+INDEXES = """
+CREATE INDEX spells_player ON spells (player);
+CREATE INDEX spells_club ON spells (club, start_year, end_year);
+"""
+
+
+class SQLiteCareerView(Mapping):
+    """
+    Read-only dict-like view of a SQLitePlayerDatabase
+
+    Membership tests and lookups are single indexed queries, so code written
+    against PlayerDatabase.players_db works without loading every player
+    """
+    def __init__(self, db: "SQLitePlayerDatabase") -> None:
+        self._db = db
+
+    def __getitem__(self, player_name: str) -> List[Tuple[str, int, int]]:
+        spells = self._db.get_player_data(player_name)
+        if not spells:
+            raise KeyError(player_name)
+        return spells
+
+    def __contains__(self, player_name: object) -> bool:
+        return self._db.query_one("SELECT 1 FROM spells WHERE player = ? LIMIT 1", (player_name,)) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self._db.connection.execute(
+            "SELECT DISTINCT player FROM spells ORDER BY player"))
+
+    def __len__(self) -> int:
+        return self._db.player_count
+
+
+class SQLiteClubIndexView(Mapping):
+    """Club name -> ClubIndex mapping, each index read from SQL on demand"""
+    def __init__(self, db: "SQLitePlayerDatabase") -> None:
+        self._db = db
+
+    def __getitem__(self, club: str) -> ClubIndex:
+        rows = self._db.connection.execute(
+            "SELECT player, start_year, end_year FROM spells WHERE club = ? ORDER BY start_year",
+            (club,)).fetchall()
+        if not rows:
+            raise KeyError(club)
+        return ClubIndex.from_sorted([row[0] for row in rows], array('i', [row[1] for row in rows]),
+                                     array('i', [row[2] for row in rows]))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._db.get_all_clubs())
+
+    def __len__(self) -> int:
+        return self._db.query_one("SELECT COUNT(DISTINCT club) FROM spells")[0]
+
+
+class SQLitePlayerDatabase(PlayerDatabase):
+    """
+    SQLite Player Database for Tm8s
+
+    Imports the CSV into an on-disk SQLite file (indexed by player and by
+    club, start, end, with an FTS5 table of names) and answers every query
+    with SQL, so memory use does not grow with the dataset. The import is
+    skipped when the file already matches the CSV.
+    Exposes the same API as PlayerDatabase
+    """
+    def __init__(self, csv_file: str = "players_database.csv", db_file: Optional[str] = None,
+                 index_names: bool = False) -> None:
+        """
+        Initialize the SQLite player database
+
+        :param csv_file: The path to the CSV file containing player data ("players_database.csv")
+        :param db_file: Path of the SQLite file, defaults to the CSV path plus ".sqlite"
+        :param index_names: Unused; names are searched through the FTS5 table, never a NameIndex
+        """
+        self.db_file = db_file or csv_file + ".sqlite"
+        self._local = threading.local()
+        self.player_count = 0
+        # Bumped when the file is re-imported, so other threads reopen it
+        self.file_version = 0
+
+        super().__init__(csv_file, index_names=False)
+
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection to the database file"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.file_version != self.file_version:
+            connection.close()
+            connection = None
+        if connection is None:
+            connection = sqlite3.connect(self.db_file)
+            self._local.connection = connection
+            self._local.file_version = self.file_version
+        return connection
+
+    def query_one(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        return self.connection.execute(sql, params).fetchone()
+
+
+    @metrics.timer("load_database")
+    def load_database(self) -> None:
+        """
+        Import the CSV into SQLite unless the file is already current
+
+        columns: "Player Name", "Club", "Start Year", "End Year"
+        The whole import runs in one transaction, with indexes built after the rows
+        """
+        try:
+            if not self._is_current(os.stat(self.csv_file)):
+                self._import_csv(*self.read_rows())
+                metrics.count("sqlite_imports")
+            self.player_count = int(self.query_one("SELECT value FROM meta WHERE key = 'players'")[0])
+            self.install_file_state()
+        except Exception as e:
+            metrics.error("load_database", e)
+
+        self.generation += 1
+
+
+    def install_file_state(self) -> None:
+        """
+        Publish views over the database file, stamped with the CSV its meta table records
+
+        Every query reads the file itself; re-imports swap the whole file in
+        """
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        stamp = CsvStamp(int(meta["csv_size"]), int(meta["csv_mtime_ns"]), bytes.fromhex(meta["csv_sha256"]))
+        self.install_state(DatabaseState(SQLiteCareerView(self), SQLiteClubIndexView(self), stamp))
+
+
+    def _is_current(self, stat: os.stat_result) -> bool:
+        """Whether the SQLite file was imported from this exact CSV"""
+        try:
+            meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError:
+            return False
+
+        if meta.get("schema") != SCHEMA_VERSION or meta.get("csv_size") != str(stat.st_size):
+            return False
+        return (meta.get("csv_mtime_ns") == str(stat.st_mtime_ns)
+                or meta.get("csv_sha256") == file_digest(self.csv_file).hex())
+
+
+    def _import_csv(self, rows: Iterator[CsvRow], stamp: CsvStamp) -> None:
+        """
+        Rebuild the database file from the CSV in a single transaction
+
+        The new file is built next to the old one and renamed over it, so
+        other threads keep reading the old file until they reopen
+
+        :arg rows: Every row of the CSV, from read_rows
+        :arg stamp: The CSV bytes the rows were parsed from, recorded in the meta table
+        """
+        temp_file = f"{self.db_file}.{os.getpid()}.tmp"
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+        connection = sqlite3.connect(temp_file)
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+
+        try:
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.executemany(
+                    "INSERT INTO spells (player, club, start_year, end_year) VALUES (?, ?, ?, ?)", rows)
+                for statement in INDEXES.strip().splitlines():
+                    connection.execute(statement)
+                connection.execute("INSERT INTO player_names (name) SELECT DISTINCT player FROM spells")
+
+                players = connection.execute("SELECT COUNT(*) FROM player_names").fetchone()[0]
+                connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                    ("schema", SCHEMA_VERSION),
+                    ("csv_size", str(stamp.size)),
+                    ("csv_mtime_ns", str(stamp.mtime_ns)),
+                    ("csv_sha256", stamp.digest.hex()),
+                    ("players", str(players)),
+                ])
+        finally:
+            connection.close()
+
+        os.replace(temp_file, self.db_file)
+        self.file_version += 1
+
+
+    def apply_appended_rows(self, rows: List[CsvRow], stamp: CsvStamp) -> None:
+        """
+        Insert rows appended to the CSV, and any new names, in one transaction
+
+        :arg rows: The appended rows
+        :arg stamp: The CSV up to the last appended row, recorded in the meta table
+        """
+        connection = self.connection
+        with connection:
+            last_row = connection.execute("SELECT COALESCE(MAX(rowid), 0) FROM spells").fetchone()[0]
+            connection.executemany(
+                "INSERT INTO spells (player, club, start_year, end_year) VALUES (?, ?, ?, ?)", rows)
+            connection.execute(
+                "INSERT INTO player_names (name) SELECT DISTINCT player FROM spells new "
+                "WHERE new.rowid > ? AND NOT EXISTS "
+                "(SELECT 1 FROM spells old WHERE old.player = new.player AND old.rowid <= ?)",
+                (last_row, last_row))
+            self.player_count = connection.execute("SELECT COUNT(*) FROM player_names").fetchone()[0]
+
+            connection.executemany("UPDATE meta SET value = ? WHERE key = ?", [
+                (str(stamp.size), "csv_size"),
+                (str(stamp.mtime_ns), "csv_mtime_ns"),
+                (stamp.digest.hex(), "csv_sha256"),
+                (str(self.player_count), "players"),
+            ])
+        self.install_file_state()
+
+    def apply_rewrite(self) -> None:
+        """Re-import the whole CSV into a new database file"""
+        self._import_csv(*self.read_rows())
+        metrics.count("sqlite_imports")
+        self.player_count = int(self.query_one("SELECT value FROM meta WHERE key = 'players'")[0])
+        self.install_file_state()
+
+
+    def get_all_players(self) -> List[str]:
+        """Get list of all player names"""
+        return [row[0] for row in self.connection.execute(
+            "SELECT DISTINCT player FROM spells ORDER BY player")]
+
+    def get_player_data(self, player_name: str) -> List[Tuple[str, int, int]]:
+        """
+        Get club history for a player
+
+        :arg player_name: The name of the player to retrieve
+        """
+        return self.connection.execute(
+            "SELECT club, start_year, end_year FROM spells WHERE player = ? ORDER BY rowid",
+            (player_name,)).fetchall()
+
+    @metrics.timer("search_players")
+    def search_players(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Search for players by partial name through the FTS5 name table
+
+        Every word of the query must prefix a word of the name, ignoring case
+        and accents. Names starting with the query rank first, then shorter names.
+        Falls back to a substring match when no name has matching words.
+        An empty query matches every name, in sorted order
+
+        :arg query: Partial player name
+        :arg limit: Maximum number of results, None for all; 0 or less returns nothing
+        """
+        if limit is not None and limit <= 0:
+            return []
+        limit = -1 if limit is None else limit
+
+        words = normalize_name(query).split()
+        if not words:
+            return [row[0] for row in self.connection.execute(
+                "SELECT name FROM player_names ORDER BY name LIMIT ?", (limit,))]
+
+        match = " AND ".join('"' + word.replace('"', '""') + '"*' for word in words)
+        names = [row[0] for row in self.connection.execute(
+            "SELECT name FROM player_names WHERE player_names MATCH ? "
+            "ORDER BY name NOT LIKE ? || '%', length(name), name LIMIT ?",
+            (match, query.strip(), limit))]
+
+        if not names and len(query.strip()) >= 3:
+            names = [row[0] for row in self.connection.execute(
+                "SELECT name FROM player_names WHERE name LIKE '%' || ? || '%' "
+                "ORDER BY length(name), name LIMIT ?", (query.strip(), limit))]
+        return names
+
+    def get_all_clubs(self) -> List[str]:
+        """Get list of all club names"""
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT club FROM spells ORDER BY club")]
+
+    def get_overlapping_players(self, club: str, start_year: int, end_year: int) -> List[Tuple[str, int, int]]:
+        """
+        Get every player whose spell at a club overlaps a time window, using the club index
+
+        :arg club: The club name
+        :arg start_year: Start of the window
+        :arg end_year: End of the window
+        :return: List of (player, start_year, end_year) spells at the club
+        """
+        if start_year >= end_year:
+            return []
+        return self.connection.execute(
+            "SELECT player, start_year, end_year FROM spells "
+            "WHERE club = ? AND start_year < ? AND end_year > ? AND start_year < end_year "
+            "ORDER BY start_year",
+            (club, end_year, start_year)).fetchall()
+
+
+    def query_connections(self, p1: str, p2: str) -> List[Connection]:
+        """
+        Shared spells of two players, computed by a self-join in SQL
+
+        :arg p1: First player name
+        :arg p2: Second player name
+        """
+        rows = self.connection.execute(
+            "SELECT a.club, MAX(a.start_year, b.start_year), MIN(a.end_year, b.end_year), "
+            "a.start_year, a.end_year, b.start_year, b.end_year "
+            "FROM spells a JOIN spells b ON b.club = a.club "
+            "WHERE a.player = ? AND b.player = ? "
+            "AND MAX(a.start_year, b.start_year) < MIN(a.end_year, b.end_year) "
+            "ORDER BY a.rowid, b.rowid",
+            (p1, p2))
+        return [Connection(*row) for row in rows]
+
+    def query_teammates(self, player: str) -> List[Tuple[str, Connection]]:
+        """
+        Everyone who overlapped with a player, computed by a self-join in SQL
+
+        :arg player: The player's name
+        :return: (teammate, connection seen from the player's side) pairs
+        """
+        rows = self.connection.execute(
+            "SELECT b.player, a.club, MAX(a.start_year, b.start_year), MIN(a.end_year, b.end_year), "
+            "a.start_year, a.end_year, b.start_year, b.end_year "
+            "FROM spells a JOIN spells b ON b.club = a.club "
+            "AND b.start_year < a.end_year AND b.end_year > a.start_year "
+            "WHERE a.player = ? AND b.player != a.player "
+            "AND MAX(a.start_year, b.start_year) < MIN(a.end_year, b.end_year) "
+            "ORDER BY a.rowid, b.start_year",
+            (player,))
+        return [(row[0], Connection(*row[1:])) for row in rows]
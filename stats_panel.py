@@ -0,0 +1,99 @@
+"""
+Instrumentation panel for Tm8s
+"""
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+from instrumentation import Metrics
+
+
+class StatsPanel(QtWidgets.QDialog):
+    """
+    Small window showing the live metrics
+
+    Refreshes once a second while open. Can save the metrics as JSON, reset
+    them, and ask for the next search to run under cProfile
+    """
+    profile_ready = QtCore.pyqtSignal(str)
+
+    def __init__(self, metrics: Metrics, parent=None) -> None:
+        """
+        :arg metrics: The registry to show
+        :arg parent: Owning widget
+        """
+        super().__init__(parent)
+        self.metrics = metrics
+        self.setWindowTitle("Tm8s stats")
+        self.resize(520, 420)
+
+        self.text = QtWidgets.QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.SystemFont.FixedFont))
+
+        self.profile_box = QtWidgets.QCheckBox("Profile next search", self)
+        reset_button = QtWidgets.QPushButton("Reset", self)
+        save_button = QtWidgets.QPushButton("Save JSON...", self)
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.profile_box)
+        buttons.addStretch()
+        buttons.addWidget(reset_button)
+        buttons.addWidget(save_button)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.text)
+        layout.addLayout(buttons)
+
+        self.profile_report = ""
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setInterval(1000)
+
+        self.refresh_timer.timeout.connect(self.refresh)
+        reset_button.clicked.connect(self.reset)
+        save_button.clicked.connect(self.save)
+        self.profile_ready.connect(self.show_profile)
+
+
+    def showEvent(self, event: QtGui.QShowEvent) -> None:
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event: QtGui.QHideEvent) -> None:
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+
+    def take_profile_request(self) -> bool:
+        """Whether the next search should be profiled; clears the request"""
+        requested = self.profile_box.isChecked()
+        self.profile_box.setChecked(False)
+        return requested
+
+    def show_profile(self, report: str) -> None:
+        """Keep the last profile report and show it under the metrics"""
+        self.profile_report = report
+        self.refresh()
+
+
+    def refresh(self) -> None:
+        text = self.metrics.report()
+        if self.profile_report:
+            text += "\n\nLast profiled search:\n" + self.profile_report
+        if text != self.text.toPlainText():
+            self.text.setPlainText(text)
+
+    def reset(self) -> None:
+        self.metrics.reset()
+        self.profile_report = ""
+        self.refresh()
+
+    def save(self) -> None:
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save metrics", "tm8s_metrics.json",
+                                                        "JSON files (*.json)")
+        if not path:
+            return
+        try:
+            self.metrics.dump(path)
+        except Exception as e:
+            self.metrics.error("save_metrics", e)
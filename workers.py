@@ -0,0 +1,76 @@
+"""
+Background workers for Tm8s
+"""
+
+import threading
+from typing import Any, Callable
+
+from PyQt6 import QtCore
+
+from connections import SearchCancelled
+
+# A search body: called with a progress(percent) reporter and a cancelled() check
+SearchTask = Callable[[Callable[[int], None], Callable[[], bool]], Any]
+
+
+class SearchSignals(QtCore.QObject):
+    """
+    Signals emitted by a SearchWorker
+
+    Created on the GUI thread, so connected slots run there
+    """
+    progress = QtCore.pyqtSignal(int)
+    finished = QtCore.pyqtSignal(object)
+    cancelled = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)
+
+
+class SearchWorker(QtCore.QRunnable):
+    """
+    Runs one search off the GUI thread on a QThreadPool
+
+    The task reports progress as a percentage and polls cancelled(); calling
+    cancel() makes the next poll raise SearchCancelled inside the task
+    """
+    def __init__(self, task: SearchTask) -> None:
+        """
+        :arg task: The search body to run
+        """
+        super().__init__()
+        self.task = task
+        self.signals = SearchSignals()
+        self._cancel = threading.Event()
+        self._last_percent = -1
+
+
+    def cancel(self) -> None:
+        """Ask the running task to stop at its next cancel check"""
+        self._cancel.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, percent: int) -> None:
+        """Emit progress, skipping repeats so the GUI thread is not flooded"""
+        percent = max(0, min(100, percent))
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.signals.progress.emit(percent)
+
+
+    def run(self) -> None:
+        """Run the task and report its outcome through signals"""
+        try:
+            result = self.task(self.report, self.is_cancelled)
+        except SearchCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        if self.is_cancelled():
+            self.signals.cancelled.emit()
+        else:
+            self.report(100)
+            self.signals.finished.emit(result)